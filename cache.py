@@ -8,6 +8,8 @@ from config import CACHE_FILE, CACHE_TIMEOUT_DAYS
 EPISODES_CACHE_FILE = "cache_episodes.json"
 # Global cache for failed Simkl ID lookups
 FAILED_LOOKUPS_FILE = "failed_lookups.json"
+# Caches that record state rather than API responses and therefore never expire
+NON_EXPIRING_CACHE_KEYS = ('failed_lookups', 'sent_episodes')
 
 def get_cache_file(cache_key):
     """Get the cache file path based on the cache key."""
@@ -23,8 +25,8 @@ def get_cache_file(cache_key):
         base, ext = os.path.splitext(CACHE_FILE)
         return f"{base}_{cache_key}{ext}"
 
-def load_cache(cache_key='ratings'):
-    """Load cached items if they exist and are not expired."""
+def load_cache(cache_key='ratings', ignore_expiry=False):
+    """Load cached items if they exist and are not expired (or regardless of age with ignore_expiry)."""
     cache_file = get_cache_file(cache_key)
     if not os.path.exists(cache_file):
         return None
@@ -36,10 +38,14 @@ def load_cache(cache_key='ratings'):
         # For episodes cache, we need to extract the specific show's episodes
         if cache_key.startswith('episodes_') and cache_file == EPISODES_CACHE_FILE:
             show_slug = cache_key.replace('episodes_', '')
-            return cache_data.get('items', {}).get(show_slug, [])
+            # Every show expires on its own (shows cached before fetch times were recorded count as expired)
+            fetched_at = cache_data.get('fetched', {}).get(show_slug, 0)
+            if not ignore_expiry and time.time() - fetched_at > (CACHE_TIMEOUT_DAYS * 24 * 60 * 60):
+                return None
+            return cache_data.get('items', {}).get(show_slug)
 
-        # Check if cache is expired (except for failed lookups which don't expire)
-        if cache_key != 'failed_lookups':
+        # Check if cache is expired (except for state caches like failed lookups which don't expire)
+        if cache_key not in NON_EXPIRING_CACHE_KEYS and not ignore_expiry:
             cache_timestamp = cache_data.get('timestamp', 0)
             current_time = time.time()
             if current_time - cache_timestamp > (CACHE_TIMEOUT_DAYS * 24 * 60 * 60):
@@ -73,6 +79,7 @@ def save_cache(items, cache_key='ratings'):
             # Update with new data for this show
             existing_data['timestamp'] = time.time()
             existing_data['items'][show_slug] = items
+            existing_data.setdefault('fetched', {})[show_slug] = time.time()
 
             # Save updated cache
             with open(EPISODES_CACHE_FILE, 'w', encoding='utf-8') as f:
@@ -0,0 +1,106 @@
+"""Record/replay store for taste.io and Simkl traffic.
+
+With HTTP_CASSETTE_MODE=record every final HTTP response (and every JSON page loaded through
+Selenium) is written to CASSETTE_DIR; with HTTP_CASSETTE_MODE=replay they are served from there
+without touching the network or starting Chrome, which makes a full run repeatable in seconds.
+
+Interactions are keyed by method, URL, query parameters and JSON body. Credentials are never part
+of the key or the stored data, so recordings can be replayed with different tokens and client IDs.
+Identical requests made several times in a run are replayed in the recorded order.
+"""
+import hashlib
+import json
+import os
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from config import CASSETTE_DIR
+
+# Query parameters that carry credentials and are left out of keys and recordings
+SECRET_PARAMS = ("client_id",)
+# Response headers that are not worth (or not safe) storing
+SKIPPED_HEADERS = ("set-cookie", "content-encoding", "transfer-encoding", "content-length")
+
+class CassetteMissError(requests.exceptions.ConnectionError):
+    """Raised in replay mode when a request was never recorded."""
+
+_lock = threading.Lock()
+_recorded_keys = set()  # Keys already (re)written during this run
+_replay_positions = {}  # Next interaction to serve per key
+
+def _public_params(params) -> dict:
+    return {key: value for key, value in dict(params or {}).items() if key not in SECRET_PARAMS}
+
+def interaction_key(method: str, url: str, params=None, json_body=None) -> str:
+    """Return the file name stem an interaction is stored under."""
+    fingerprint = json.dumps(
+        [method.upper(), url, _public_params(params), json_body], sort_keys=True, default=str
+    )
+    host = urlsplit(url).netloc.replace(":", "_")
+    return f"{host}_{hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()[:16]}"
+
+def _path(key: str) -> str:
+    return os.path.join(CASSETTE_DIR, f"{key}.json")
+
+def _store(key: str, interaction: dict) -> None:
+    """Append an interaction to its cassette file, replacing recordings left by earlier runs."""
+    with _lock:
+        os.makedirs(CASSETTE_DIR, exist_ok=True)
+        interactions = []
+        if key in _recorded_keys and os.path.exists(_path(key)):
+            with open(_path(key), 'r', encoding='utf-8') as f:
+                interactions = json.load(f)
+        interactions.append(interaction)
+        tmp_path = f"{_path(key)}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(interactions, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, _path(key))
+        _recorded_keys.add(key)
+
+def _load(key: str, description: str) -> dict:
+    """Return the next recorded interaction for the key, repeating the last one once they run out."""
+    with _lock:
+        if not os.path.exists(_path(key)):
+            raise CassetteMissError(f"No recording for {description} in {CASSETTE_DIR}")
+        with open(_path(key), 'r', encoding='utf-8') as f:
+            interactions = json.load(f)
+        position = _replay_positions.get(key, 0)
+        _replay_positions[key] = position + 1
+        return interactions[min(position, len(interactions) - 1)]
+
+def record(method: str, url: str, response: requests.Response, params=None, json=None, **kwargs) -> None:
+    """Store the final response of an HTTP request."""
+    _store(interaction_key(method, url, params, json), {
+        "method": method.upper(),
+        "url": url,
+        "params": _public_params(params),
+        "json": json,
+        "status": response.status_code,
+        "headers": {
+            name: value for name, value in response.headers.items()
+            if name.lower() not in SKIPPED_HEADERS
+        },
+        "body": response.text,
+    })
+
+def replay(method: str, url: str, params=None, json=None, **kwargs) -> requests.Response:
+    """Build the recorded response for an HTTP request."""
+    interaction = _load(interaction_key(method, url, params, json), f"{method.upper()} {url}")
+    response = requests.Response()
+    response.status_code = interaction["status"]
+    response.headers = CaseInsensitiveDict(interaction["headers"])
+    response._content = interaction["body"].encode("utf-8")
+    response.encoding = "utf-8"
+    response.url = url
+    return response
+
+def record_page(url: str, body_text: str) -> None:
+    """Store the body text of a page loaded through Selenium."""
+    _store(interaction_key("BROWSER", url), {"method": "BROWSER", "url": url, "body": body_text})
+
+def replay_page(url: str) -> str:
+    """Return the recorded body text of a page loaded through Selenium."""
+    return _load(interaction_key("BROWSER", url), f"page {url}")["body"]
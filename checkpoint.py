@@ -0,0 +1,92 @@
+"""Scrape checkpoint: per-item progress of an unfinished scraper run.
+
+Records, for every title, the sources it came from, its resolved Simkl entry (or that none was
+found) and its watched episodes, so a run stopped by the Simkl daily quota continues with the next
+unresolved title the following day instead of starting over. The checkpoint is removed once a run
+gets through every title.
+"""
+import json
+import os
+
+from config import SCRAPE_CHECKPOINT_FILE
+from entities import entity_key
+from episodes import EpisodeSet
+from schemas import MediaEntry, TasteIOEntity
+
+# Number of recorded changes after which the checkpoint is written to disk
+SAVE_EVERY = 20
+
+def checkpoint_key(entity: TasteIOEntity) -> str:
+    return json.dumps(entity_key(entity["item"]), ensure_ascii=False)
+
+class ScrapeCheckpoint:
+    """Progress records keyed by checkpoint_key, persisted every SAVE_EVERY changes and by save()."""
+
+    def __init__(self, path: str = SCRAPE_CHECKPOINT_FILE):
+        self.path = path
+        self.items = {}
+        self.unsaved = 0
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.items = json.load(f).get('items', {})
+            except Exception as e:
+                print(f"Error loading scrape checkpoint, starting from scratch: {e}")
+        if self.items:
+            print(f"Resuming scrape: {len(self.items)} titles were already processed in a previous run")
+
+    def get(self, entity: TasteIOEntity) -> dict | None:
+        """Return the record of an already resolved title, unless its sources, status or rating changed since."""
+        record = self.items.get(checkpoint_key(entity))
+        if record is None:
+            return None
+        if (record["sources"], record["status"], record["rating"]) != (entity["sources"], entity["status"], entity["rating"]):
+            return None
+        return record
+
+    def record_resolution(self, entity: TasteIOEntity, entry: MediaEntry | None) -> dict:
+        """Record the Simkl entry a title resolved to (None when it was skipped)."""
+        record = self.items[checkpoint_key(entity)] = {
+            "slug": entity["item"].get("slug"),
+            "sources": list(entity["sources"]),
+            "status": entity["status"],
+            "rating": entity["rating"],
+            "entry": entry,
+            "episodes": None,
+        }
+        self._changed()
+        return record
+
+    def get_episodes(self, entity: TasteIOEntity) -> EpisodeSet | None:
+        """Return the recorded episodes of a show, or None if they still have to be fetched."""
+        record = self.get(entity)
+        if record is None or record["episodes"] is None:
+            return None
+        return EpisodeSet.from_ranges(record["episodes"])
+
+    def record_episodes(self, entity: TasteIOEntity, episodes: EpisodeSet) -> None:
+        record = self.get(entity)
+        if record is not None:
+            record["episodes"] = episodes.to_ranges()
+            self._changed()
+
+    def _changed(self) -> None:
+        self.unsaved += 1
+        if self.unsaved >= SAVE_EVERY:
+            self.save()
+
+    def save(self) -> None:
+        if not self.unsaved:
+            return
+        # Write to a temporary file first so a crash never leaves a truncated checkpoint
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'items': self.items}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+        self.unsaved = 0
+
+    def clear(self) -> None:
+        self.items = {}
+        self.unsaved = 0
+        if os.path.exists(self.path):
+            os.remove(self.path)
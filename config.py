@@ -86,13 +86,49 @@ def get_bool_env(var_name, default="true"):
     val = os.getenv(var_name, default)
     return str(val).strip().lower() in ("1", "true", "yes", "on")
 
+# Adaptive pacing settings (per-host AIMD delay between requests, see pacing.py)
+ADAPTIVE_PACING = get_bool_env("ADAPTIVE_PACING", "true")  # When disabled, page loads use the fixed MIN_DELAY/MAX_DELAY sleep
+PACING_JITTER_FLOOR = get_bool_env("PACING_JITTER_FLOOR", "false")  # Never go below a random MIN_DELAY/MAX_DELAY delay
+PACING_MIN_DELAY = float(os.getenv("PACING_MIN_DELAY", 0.2))
+PACING_MAX_DELAY = float(os.getenv("PACING_MAX_DELAY", 60))
+PACING_DECREASE_STEP = float(os.getenv("PACING_DECREASE_STEP", 0.1))  # Subtracted from the delay after each healthy response
+PACING_BACKOFF_FACTOR = float(os.getenv("PACING_BACKOFF_FACTOR", 2.0))  # Multiplies the delay when the host pushes back
+
+# HTTP transport settings (shared by scraper.py and importer.py, see transport.py)
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 10))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", 60))
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", 10))  # Keep-alive connections per host
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", 4))
+HTTP_BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", 1.0))
+HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", 60))
+CIRCUIT_BREAKER_THRESHOLD = int(os.getenv("CIRCUIT_BREAKER_THRESHOLD", 5))  # Consecutive failures before a host is paused
+CIRCUIT_BREAKER_COOLDOWN = float(os.getenv("CIRCUIT_BREAKER_COOLDOWN", 120))
+# Record/replay of taste.io and Simkl traffic: "off", "record" or "replay" (see cassette.py)
+HTTP_CASSETTE_MODE = os.getenv("HTTP_CASSETTE_MODE", "off").strip().lower()
+CASSETTE_DIR = os.getenv("CASSETTE_DIR", "cassettes")
+# Revalidate the taste.io episodes and continue-watching responses with ETag/Last-Modified (see http_cache.py)
+HTTP_RESPONSE_CACHE = get_bool_env("HTTP_RESPONSE_CACHE", "true")
+
 # Browser settings
 HEADLESS_MODE = get_bool_env("HEADLESS_MODE", "true")
 PAGE_LOAD_TIMEOUT = int(os.getenv("PAGE_LOAD_TIMEOUT", 30))
+# Lean browser profile for JSON page loads: no window maximizing, no images/fonts/CSS, fewer Chrome subsystems
+LEAN_BROWSER = get_bool_env("LEAN_BROWSER", "false")
+BROWSER_PAGE_LOAD_STRATEGY = os.getenv("BROWSER_PAGE_LOAD_STRATEGY", "eager").strip().lower()  # normal, eager or none
+BROWSER_BLOCK_RESOURCES = get_bool_env("BROWSER_BLOCK_RESOURCES", "true")
+# Fetch several API pages per WebDriver round trip from inside the loaded taste.io page
+BROWSER_BATCH_FETCH = get_bool_env("BROWSER_BATCH_FETCH", "false")
+BROWSER_BATCH_SIZE = int(os.getenv("BROWSER_BATCH_SIZE", 5))
 
 # Output settings
 OUTPUT_FILE = os.getenv("OUTPUT_FILE", "SimklBackup.json")
 JSON_INDENT = 2
+# Also write an indexed SQLite database with the entries and watched episodes (see export_db.py)
+EXPORT_DB = get_bool_env("EXPORT_DB", "false")
+EXPORT_DB_FILE = os.getenv("EXPORT_DB_FILE", "SimklBackup.db")
+
+# Profiling settings (used with --profile)
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
 
 # Cache settings
 CACHE_FILE = os.getenv("CACHE_FILE", "cache.json")
@@ -102,3 +138,58 @@ CACHE_TIMEOUT_DAYS = int(os.getenv("CACHE_TIMEOUT_DAYS", 1))
 SCRAPE_RATINGS = get_bool_env("SCRAPE_RATINGS", "true")
 SCRAPE_SAVED = get_bool_env("SCRAPE_SAVED", "true")
 SCRAPE_CONTINUE_WATCHING = get_bool_env("SCRAPE_CONTINUE_WATCHING", "true")
+# Fetch the sources concurrently (continue-watching alongside the browser-based ratings and saved items)
+SCRAPE_CONCURRENTLY = get_bool_env("SCRAPE_CONCURRENTLY", "true")
+# Only write episodes to watched_episodes.json that the importer hasn't sent to Simkl yet
+EMIT_NEW_EPISODES_ONLY = get_bool_env("EMIT_NEW_EPISODES_ONLY", "true")
+# Per-title progress of an interrupted scraper run, so the next run continues where it stopped (see checkpoint.py)
+SCRAPE_CHECKPOINT_FILE = os.getenv("SCRAPE_CHECKPOINT_FILE", "scrape_checkpoint.json")
+
+# Import settings
+# Merge the import into the fewest Simkl calls (see planner.py) instead of one call per rating and list
+IMPORT_PLANNER = get_bool_env("IMPORT_PLANNER", "true")
+# Send all ratings in one call using per-item rating fields instead of one call per rating value
+SIMKL_PER_ITEM_RATINGS = get_bool_env("SIMKL_PER_ITEM_RATINGS", "true")
+# Records the requests Simkl accepted so an interrupted import can resume (see journal.py)
+IMPORT_JOURNAL_FILE = os.getenv("IMPORT_JOURNAL_FILE", "import_journal.json")
+# Items per Simkl request (0 = no limit) and requests sent in parallel, unless tune.py calibrated them
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", 0))
+IMPORT_CONCURRENCY = int(os.getenv("IMPORT_CONCURRENCY", 1))
+# Use the settings calibrated by tune.py from IMPORT_TUNING_FILE when it exists
+IMPORT_AUTOTUNE = get_bool_env("IMPORT_AUTOTUNE", "true")
+IMPORT_TUNING_FILE = os.getenv("IMPORT_TUNING_FILE", "import_tuning.json")
+IMPORT_TUNING_REPORT = os.getenv("IMPORT_TUNING_REPORT", "import_tuning_report.txt")
+# Live handoff: the scraper appends its output to HANDOFF_FILE as it goes and importer.py --follow uploads it (see handoff.py)
+LIVE_HANDOFF = get_bool_env("LIVE_HANDOFF", "false")
+HANDOFF_FILE = os.getenv("HANDOFF_FILE", "handoff.jsonl")
+HANDOFF_BATCH_SIZE = int(os.getenv("HANDOFF_BATCH_SIZE", 100))  # Records per upload batch
+HANDOFF_POLL_SECONDS = float(os.getenv("HANDOFF_POLL_SECONDS", 2))  # How often importer.py --follow checks the feed
+
+# Work queue settings (distributed Simkl ID resolution, disabled by default)
+USE_WORK_QUEUE = get_bool_env("USE_WORK_QUEUE", "false")
+WORK_QUEUE_FILE = os.getenv("WORK_QUEUE_FILE", "work_queue.db")
+WORK_QUEUE_LOCAL_WORKERS = int(os.getenv("WORK_QUEUE_LOCAL_WORKERS", 1))  # Workers started by scraper.py itself
+WORK_QUEUE_LEASE_SECONDS = int(os.getenv("WORK_QUEUE_LEASE_SECONDS", 300))
+WORK_QUEUE_POLL_SECONDS = float(os.getenv("WORK_QUEUE_POLL_SECONDS", 2))
+# Comma separated list of Simkl client IDs the workers may spread lookups over (defaults to SIMKL_CLIENT_ID)
+SIMKL_CLIENT_IDS = [
+    client_id.strip()
+    for client_id in os.getenv("SIMKL_CLIENT_IDS", SIMKL_CLIENT_ID or "").split(",")
+    if client_id.strip()
+]
+SIMKL_DAILY_QUOTA = int(os.getenv("SIMKL_DAILY_QUOTA", 1000))  # Requests per client ID per day
+
+# Sync daemon settings (see daemon.py), refresh intervals in minutes
+DAEMON_RATINGS_INTERVAL = float(os.getenv("DAEMON_RATINGS_INTERVAL", 360))
+DAEMON_SAVED_INTERVAL = float(os.getenv("DAEMON_SAVED_INTERVAL", 360))
+DAEMON_WATCHING_INTERVAL = float(os.getenv("DAEMON_WATCHING_INTERVAL", 60))
+DAEMON_EPISODES_INTERVAL = float(os.getenv("DAEMON_EPISODES_INTERVAL", 120))
+# Send detected changes to Simkl right away (otherwise the daemon only keeps the backup up to date)
+DAEMON_PUSH_CHANGES = get_bool_env("DAEMON_PUSH_CHANGES", "true")
+# The daemon's own import journal, so a manual importer.py run never clears or races on it
+DAEMON_JOURNAL_FILE = os.getenv("DAEMON_JOURNAL_FILE", "daemon_journal.json")
+
+# Local read API settings (see serve.py)
+SERVE_HOST = os.getenv("SERVE_HOST", "127.0.0.1")
+SERVE_PORT = int(os.getenv("SERVE_PORT", 8765))
+SERVE_RELOAD_SECONDS = float(os.getenv("SERVE_RELOAD_SECONDS", 2))  # How often the scraper's output is checked for changes
@@ -0,0 +1,296 @@
+"""Long-running sync daemon: scraper and importer in one process that keeps Chrome, the HTTP
+connection pools and the scraped data warm in memory instead of cold-starting them from cron.
+
+Ratings, saved items, continue-watching items and watched episodes are each refreshed on their
+own interval. New Simkl lookups are paced so SIMKL_DAILY_QUOTA is spread over the whole day, and
+only entries that are new or whose status or rating changed (and only episodes Simkl hasn't
+accepted yet) are pushed through the importer's planner.
+
+Usage:
+    python daemon.py [--once]
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+import export_db
+import importer
+import scraper
+import work_queue
+from cache import SimklApiLimitException
+from config import (
+    BASE_URL, SAVED_URL, TASTE_TOKEN, OUTPUT_FILE, JSON_INDENT,
+    SCRAPE_RATINGS, SCRAPE_SAVED, SCRAPE_CONTINUE_WATCHING, EXPORT_DB,
+    SIMKL_CLIENT_ID, SIMKL_ACCESS_TOKEN, SIMKL_DAILY_QUOTA,
+    DAEMON_RATINGS_INTERVAL, DAEMON_SAVED_INTERVAL, DAEMON_WATCHING_INTERVAL,
+    DAEMON_EPISODES_INTERVAL, DAEMON_PUSH_CHANGES, DAEMON_JOURNAL_FILE
+)
+from entities import build_entity_index
+from http_cache import print_http_cache_summary
+from episodes import EpisodeSet, load_sent_episodes, show_key
+from journal import ImportJournal
+from schemas import SimklBackup
+
+SECONDS_PER_DAY = 24 * 60 * 60
+# Seconds before a lookup whose request failed (e.g. a timeout or a server error) is tried again
+LOOKUP_RETRY_SECONDS = 15 * 60
+
+class LookupBudget:
+    """Token bucket that spreads the daily Simkl request quota evenly over the day."""
+
+    def __init__(self, daily_quota: int):
+        self.rate = daily_quota / SECONDS_PER_DAY
+        # Allow bursts of up to an hour's worth of requests, but always at least one full lookup
+        self.capacity = max(daily_quota / 24, work_queue.MAX_REQUESTS_PER_LOOKUP)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def available(self) -> bool:
+        """Whether a worst-case lookup fits in the budget right now."""
+        self._refill()
+        return self.tokens >= work_queue.MAX_REQUESTS_PER_LOOKUP
+
+    def seconds_until_available(self) -> float:
+        self._refill()
+        return max(work_queue.MAX_REQUESTS_PER_LOOKUP - self.tokens, 0) / self.rate
+
+    def spend(self, requests: int) -> None:
+        self.tokens -= requests
+
+def seconds_until_quota_reset() -> float:
+    """Simkl quotas are daily, so wait for the next UTC day (see work_queue._today)."""
+    now = datetime.now(timezone.utc)
+    tomorrow = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return (tomorrow - now).total_seconds()
+
+class SyncDaemon:
+    """Schedules the refreshes and keeps the state needed to detect changes between them."""
+
+    def __init__(self):
+        # Refresh interval in seconds of every enabled task
+        self.intervals = {}
+        if SCRAPE_RATINGS:
+            self.intervals['ratings'] = DAEMON_RATINGS_INTERVAL * 60
+        if SCRAPE_SAVED:
+            self.intervals['saved'] = DAEMON_SAVED_INTERVAL * 60
+        if SCRAPE_CONTINUE_WATCHING and TASTE_TOKEN:
+            self.intervals['watching'] = DAEMON_WATCHING_INTERVAL * 60
+            self.intervals['episodes'] = DAEMON_EPISODES_INTERVAL * 60
+        self.next_run = {task: 0.0 for task in self.intervals}
+
+        self.sources = {'ratings': [], 'saved': [], 'watching': []}
+        self.refreshed = set()  # Tasks that already ran once (their first run may use the file caches)
+        self.entities = {}
+        self.current = {}  # Entity key -> (section, MediaEntry) of the latest sync
+        self.sent = {}  # Entity key -> MediaEntry Simkl has accepted
+        self.budget = LookupBudget(SIMKL_DAILY_QUOTA)
+        self.paused_until = 0.0  # Simkl's quota ran out, no lookups or pushes until the next day
+
+        # process_entity reads the IDs resolved so far through the hook the work queue uses
+        self.resolved = {}
+        scraper.queued_resolutions = self.resolved
+        self.retry_at = {}  # Job key -> time.time() after which a failed lookup is tried again
+
+    def paused(self) -> bool:
+        return time.time() < self.paused_until
+
+    def pause_for_quota(self, exc: SimklApiLimitException) -> None:
+        print(str(exc))
+        self.paused_until = time.time() + seconds_until_quota_reset()
+        print(f"Pausing Simkl lookups and imports until {time.strftime('%Y-%m-%d %H:%M', time.localtime(self.paused_until))}")
+
+    def refresh_source(self, task: str) -> None:
+        use_cache = task not in self.refreshed
+        if task == 'ratings':
+            self.sources['ratings'] = scraper.fetch_items_from_api(BASE_URL, 'ratings', use_cache=use_cache)
+        elif task == 'saved':
+            self.sources['saved'] = scraper.fetch_items_from_api(SAVED_URL, 'saved', use_cache=use_cache)
+        else:
+            self.sources['watching'] = scraper.fetch_continue_watching_items(use_cache=use_cache)
+
+    def resolve_pending(self) -> int:
+        """Look up the Simkl IDs of new titles while the budget allows. Returns the number deferred."""
+        deferred = 0
+        keys = {
+            work_queue.job_key(entity["item"].get("name", ""), entity["item"].get("year", ""), scraper.get_category(entity["item"]))
+            for entity in self.entities.values()
+        }
+        # Forget failed lookups of titles that are gone
+        self.retry_at = {key: at for key, at in self.retry_at.items() if key in keys}
+        for entity in self.entities.values():
+            item = entity["item"]
+            title, year, category = item.get("name", ""), item.get("year", ""), scraper.get_category(item)
+            key = work_queue.job_key(title, year, category)
+            if key in self.resolved or self.retry_at.get(key, 0) > time.time():
+                continue
+            if self.paused() or not self.budget.available():
+                deferred += 1
+                continue
+            before = scraper.simkl_request_count
+            try:
+                # Only "no match" is cached, a failed request is tried again after LOOKUP_RETRY_SECONDS
+                self.resolved[key] = scraper.get_ids(title, year, category, raise_errors=True)
+                self.retry_at.pop(key, None)
+            except SimklApiLimitException:
+                raise
+            except Exception:
+                self.retry_at[key] = time.time() + LOOKUP_RETRY_SECONDS
+            finally:
+                self.budget.spend(scraper.simkl_request_count - before)
+        return deferred
+
+    def sync_entries(self) -> None:
+        """Rebuild the entities from the in-memory sources, resolve what the budget allows and push the changes."""
+        self.entities = build_entity_index(self.sources['ratings'], self.sources['saved'], self.sources['watching'])
+        deferred = self.resolve_pending()
+        if deferred:
+            # Come back for the rest as soon as the budget allows another lookup
+            wait = self.paused_until - time.time() if self.paused() else self.budget.seconds_until_available()
+            self.next_run['lookups'] = time.monotonic() + wait
+            print(f"{deferred} Simkl lookups deferred to stay within the daily quota")
+        elif self.retry_at:
+            # Nothing was deferred, so every failed lookup waits for its retry time
+            self.next_run['lookups'] = time.monotonic() + min(self.retry_at.values()) - time.time()
+            print(f"{len(self.retry_at)} failed Simkl lookups will be retried")
+
+        self.current = {}
+        changes = SimklBackup(movies=[], shows=[])
+        changed_keys = []
+        for key, entity in self.entities.items():
+            item = entity["item"]
+            if work_queue.job_key(item.get("name", ""), item.get("year", ""), scraper.get_category(item)) not in self.resolved:
+                continue
+            entry = scraper.process_entity(entity)
+            if not entry:
+                continue
+            section = "movies" if scraper.is_movie_entity(entity) else "shows"
+            self.current[key] = (section, entry)
+            if self.sent.get(key) != entry:
+                changes[section].append(entry)
+                changed_keys.append(key)
+
+        self.write_backup()
+        if changed_keys:
+            print(f"{len(changed_keys)} new or changed entries")
+            if self.push(changes, []):
+                self.sent.update((key, self.current[key][1]) for key in changed_keys)
+
+    def refresh_episodes(self) -> None:
+        """Fetch the watched episodes of every show being watched and push the ones Simkl hasn't accepted yet."""
+        sent_episodes = load_sent_episodes()
+        shows = []
+        for key, entity in self.entities.items():
+            item = entity["item"]
+            slug = item.get("slug")
+            if 'watching' not in entity["sources"] or key not in self.current or not slug:
+                continue
+            section, entry = self.current[key]
+            if section != "shows":
+                continue
+            episodes = scraper.fetch_watched_episodes(slug, use_cache=False)
+            show = {"title": item.get("name", ""), "year": item.get("year", ""), "ids": entry.get("ids", {})}
+            new_episodes = episodes - sent_episodes.get(show_key(show), EpisodeSet())
+            if new_episodes:
+                show["seasons"] = new_episodes.to_history()
+                shows.append(show)
+
+        if shows:
+            print(f"Newly watched episodes for {len(shows)} shows")
+            # Accepted episodes are recorded in the sent episodes cache by the importer
+            self.push(SimklBackup(movies=[], shows=[]), shows)
+
+    def push(self, changes: SimklBackup, watched_shows: list) -> bool:
+        """Send the changes through the importer's planner. Returns True if Simkl accepted every call."""
+        if not DAEMON_PUSH_CHANGES or self.paused():
+            return False
+        plan = importer.build_plan(*importer.split_backup(changes), watched_shows)
+        journal = ImportJournal(DAEMON_JOURNAL_FILE)
+        importer.send_planned_calls(plan, journal)
+        if not all(journal.is_completed(call) for call in plan):
+            print("Some changes were not accepted by Simkl, they will be sent again on the next refresh")
+            return False
+        journal.clear()
+        return True
+
+    def write_backup(self) -> None:
+        """Keep the backup (and the SQLite export if enabled) in line with the latest sync."""
+        backup = SimklBackup(movies=[], shows=[])
+        for section, entry in self.current.values():
+            backup[section].append(entry)
+        with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
+            json.dump(backup, f, ensure_ascii=False, indent=JSON_INDENT)
+        if EXPORT_DB:
+            conn = export_db.connect()
+            try:
+                export_db.write_export(conn, backup)
+            finally:
+                conn.close()
+
+    def run_due_tasks(self) -> None:
+        """Run every task that is due: the source refreshes first, then one sync, then the episodes."""
+        now = time.monotonic()
+        due = [task for task, at in self.next_run.items() if at <= now]
+        # The sync below reschedules deferred lookups if any are left
+        self.next_run.pop('lookups', None)
+        try:
+            for task in ('ratings', 'saved', 'watching'):
+                if task in due:
+                    print(f"Refreshing {task}...")
+                    self.refresh_source(task)
+            if due:
+                self.sync_entries()
+            if 'episodes' in due:
+                print("Refreshing watched episodes...")
+                self.refresh_episodes()
+        except SimklApiLimitException as api_limit_exc:
+            self.pause_for_quota(api_limit_exc)
+        except Exception as e:
+            # Keep the daemon alive, the failed tasks are retried on their next run
+            print(f"An error occurred: {e}")
+
+        for task in due:
+            if task in self.intervals:
+                self.refreshed.add(task)
+                self.next_run[task] = time.monotonic() + self.intervals[task]
+
+    def run(self, once: bool = False) -> None:
+        if DAEMON_PUSH_CHANGES and (not SIMKL_CLIENT_ID or not SIMKL_ACCESS_TOKEN):
+            print("Error: SIMKL_CLIENT_ID or SIMKL_ACCESS_TOKEN not set. Please configure them in config.py")
+            return
+        if not self.intervals:
+            print("Nothing to refresh, every source is disabled in config")
+            return
+
+        while True:
+            self.run_due_tasks()
+            if once:
+                return
+            wait = min(self.next_run.values()) - time.monotonic()
+            if wait > 0:
+                print(f"Next refresh in {wait / 60:.0f} minutes")
+                time.sleep(wait)
+
+def main(argv: list | None = None):
+    parser = argparse.ArgumentParser(description="Keep Simkl in sync with taste.io from a long-running process")
+    parser.add_argument("--once", action="store_true", help="Run every refresh once and exit")
+    args = parser.parse_args(argv)
+
+    daemon = SyncDaemon()
+    try:
+        daemon.run(once=args.once)
+    except KeyboardInterrupt:
+        print("Stopping the sync daemon")
+    finally:
+        print_http_cache_summary()
+        if scraper.driver is not None:
+            scraper.print_browser_summary()
+            scraper.driver.quit()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""Cross-source entity index: merges ratings, saved and continue-watching items into one entry per title."""
+from schemas import TasteIOItem, TasteIOEntity
+
+# Sources in the order they are merged, with the Simkl status each one implies
+SOURCE_STATUSES = ('completed', 'plantowatch', 'watching')
+# When a title appears in several sources, the highest status wins:
+# a show that is still in continue-watching is being watched even if it was rated already,
+# and anything rated or being watched is no longer just planned.
+STATUS_PRECEDENCE = {'plantowatch': 0, 'completed': 1, 'watching': 2}
+
+def entity_key(item: TasteIOItem) -> tuple:
+    """Key an item by taste.io category and slug, falling back to name and year."""
+    return (item.get("category"), item.get("slug") or f"{item.get('name')}_{item.get('year')}")
+
+def get_rating(item: TasteIOItem) -> float | None:
+    """Convert a taste.io 4-star rating to Simkl's 10-point scale."""
+    star_rating = item.get("highlightRating") or item.get("user", {}).get("rating")
+    if star_rating is None:
+        return None
+    return star_rating * 2.5
+
+def build_entity_index(ratings_items: list, saved_items: list, watching_items: list) -> dict:
+    """Merge the three taste.io sources into one entity per distinct title, in first-seen order."""
+    index = {}
+    for status, items in zip(SOURCE_STATUSES, (ratings_items, saved_items, watching_items)):
+        for item in items:
+            key = entity_key(item)
+            entity = index.get(key)
+            if entity is None:
+                entity = index[key] = TasteIOEntity(item=item, status=status, rating=None, sources=[])
+            elif STATUS_PRECEDENCE[status] > STATUS_PRECEDENCE[entity["status"]]:
+                entity["item"] = item
+                entity["status"] = status
+
+            if status == 'completed':
+                entity["rating"] = get_rating(item)
+            if status not in entity["sources"]:
+                entity["sources"].append(status)
+    return index
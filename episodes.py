@@ -0,0 +1,124 @@
+"""Compact representation of watched episodes used by the scraper and the importer."""
+from cache import load_cache, save_cache
+
+# Cache key of the episodes Simkl has already accepted, per show
+SENT_EPISODES_CACHE_KEY = 'sent_episodes'
+
+class EpisodeSet:
+    """Watched episodes of one show, stored as an integer bitmask per season (bit n set = episode n watched).
+
+    Supports fast union (|) and difference (-), and converts losslessly to and from the
+    Simkl history payload shape and a run-length form used for the cache files.
+    """
+    __slots__ = ("seasons",)
+
+    def __init__(self, seasons: dict | None = None):
+        self.seasons = {season: bits for season, bits in (seasons or {}).items() if bits}
+
+    @classmethod
+    def from_episodes(cls, episodes: list) -> "EpisodeSet":
+        """Build from a list of {"season": n, "episode": m} dicts (the legacy cache format)."""
+        seasons = {}
+        for ep in episodes:
+            season, number = ep.get("season"), ep.get("episode")
+            if isinstance(season, int) and isinstance(number, int):
+                seasons[season] = seasons.get(season, 0) | (1 << number)
+        return cls(seasons)
+
+    @classmethod
+    def from_history(cls, seasons: list) -> "EpisodeSet":
+        """Build from Simkl history seasons: [{"number": s, "episodes": [{"number": e}, ...]}, ...]."""
+        return cls.from_episodes(
+            {"season": season.get("number"), "episode": ep.get("number")}
+            for season in seasons
+            for ep in season.get("episodes", [])
+        )
+
+    @classmethod
+    def from_ranges(cls, ranges: dict) -> "EpisodeSet":
+        """Build from the run-length form: {"1": [[1, 10], [12, 12]], ...}."""
+        seasons = {}
+        for season, runs in ranges.items():
+            bits = 0
+            for first, last in runs:
+                bits |= ((1 << (last - first + 1)) - 1) << first
+            seasons[int(season)] = bits
+        return cls(seasons)
+
+    @classmethod
+    def load(cls, cached) -> "EpisodeSet":
+        """Build from cached data, accepting both the run-length form and the legacy list of dicts."""
+        if isinstance(cached, dict):
+            return cls.from_ranges(cached)
+        return cls.from_episodes(cached or [])
+
+    def to_history(self) -> list:
+        """Convert to Simkl history seasons, sorted by season and episode number."""
+        return [
+            {"number": season, "episodes": [{"number": number} for number in _bit_numbers(bits)]}
+            for season, bits in sorted(self.seasons.items())
+        ]
+
+    def to_ranges(self) -> dict:
+        """Convert to the run-length form stored in the cache files."""
+        ranges = {}
+        for season, bits in sorted(self.seasons.items()):
+            runs = []
+            for number in _bit_numbers(bits):
+                if runs and runs[-1][1] == number - 1:
+                    runs[-1][1] = number
+                else:
+                    runs.append([number, number])
+            ranges[str(season)] = runs
+        return ranges
+
+    def __or__(self, other: "EpisodeSet") -> "EpisodeSet":
+        seasons = dict(self.seasons)
+        for season, bits in other.seasons.items():
+            seasons[season] = seasons.get(season, 0) | bits
+        return EpisodeSet(seasons)
+
+    def __sub__(self, other: "EpisodeSet") -> "EpisodeSet":
+        return EpisodeSet({
+            season: bits & ~other.seasons.get(season, 0)
+            for season, bits in self.seasons.items()
+        })
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, EpisodeSet) and self.seasons == other.seasons
+
+    def __len__(self) -> int:
+        return sum(bin(bits).count("1") for bits in self.seasons.values())
+
+    def __bool__(self) -> bool:
+        return bool(self.seasons)
+
+    def __repr__(self) -> str:
+        return f"EpisodeSet({self.to_ranges()})"
+
+def _bit_numbers(bits: int):
+    """Yield the positions of the set bits in ascending order."""
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+def show_key(show: dict) -> str:
+    """Key a show by its Simkl ID, falling back to title and year."""
+    simkl_id = (show.get("ids") or {}).get("simkl")
+    if simkl_id:
+        return str(simkl_id)
+    return f"{show.get('title', '')}_{show.get('year', '')}"
+
+def load_sent_episodes() -> dict:
+    """Load the episodes Simkl has already accepted, keyed by show_key."""
+    cached = load_cache(SENT_EPISODES_CACHE_KEY) or {}
+    return {key: EpisodeSet.from_ranges(ranges) for key, ranges in cached.items()}
+
+def record_sent_episodes(shows: list) -> None:
+    """Merge the seasons of successfully sent history shows into the sent episodes cache."""
+    sent = load_sent_episodes()
+    for show in shows:
+        key = show_key(show)
+        sent[key] = sent.get(key, EpisodeSet()) | EpisodeSet.from_history(show.get("seasons", []))
+    save_cache({key: episodes.to_ranges() for key, episodes in sent.items()}, SENT_EPISODES_CACHE_KEY)
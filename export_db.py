@@ -0,0 +1,148 @@
+"""Indexed SQLite export of the scraper's output, written alongside SimklBackup.json.
+
+Entries, their resolved Simkl IDs and statuses and the watched episodes go into indexed tables,
+so questions like "which movies rated 10 lack a Simkl ID" don't require parsing the whole backup,
+and the importer can stream just the rows it needs. The JSON backup can be rebuilt from it.
+
+Usage:
+    python export_db.py to-json [OUTPUT_FILE]
+"""
+import argparse
+import json
+import sqlite3
+from typing import Dict, Iterator, List, Any
+
+from config import EXPORT_DB_FILE, OUTPUT_FILE, JSON_INDENT
+from episodes import EpisodeSet, show_key
+from schemas import SimklBackup, MediaEntry
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    section TEXT NOT NULL,
+    title TEXT NOT NULL,
+    year INTEGER,
+    rating NUMERIC,
+    status TEXT NOT NULL,
+    simkl_id INTEGER,
+    tmdb_id INTEGER,
+    ids TEXT
+);
+CREATE INDEX IF NOT EXISTS entries_section_status ON entries (section, status);
+CREATE INDEX IF NOT EXISTS entries_rating ON entries (rating);
+CREATE INDEX IF NOT EXISTS entries_simkl_id ON entries (simkl_id);
+CREATE TABLE IF NOT EXISTS watched_shows (
+    show_key TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    year INTEGER,
+    ids TEXT
+);
+CREATE TABLE IF NOT EXISTS watched_episodes (
+    show_key TEXT NOT NULL,
+    season INTEGER NOT NULL,
+    episode INTEGER NOT NULL,
+    PRIMARY KEY (show_key, season, episode)
+);
+"""
+
+def connect(path: str = EXPORT_DB_FILE) -> sqlite3.Connection:
+    """Open the export database, creating the tables if needed."""
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    return conn
+
+def _year_to_db(year) -> int | None:
+    """Years are stored as integers so they can be queried and indexed (NULL when unknown)."""
+    try:
+        return int(year)
+    except (TypeError, ValueError):
+        return None
+
+def _year_from_db(year: int | None):
+    """The backup uses "" for an unknown year."""
+    return "" if year is None else year
+
+def write_export(conn: sqlite3.Connection, backup: SimklBackup, watched_shows: List[Dict[str, Any]] | None = None) -> None:
+    """Replace the exported entries with the backup's, and the watched episodes with watched_shows
+    unless it is None (the episodes of this run were incomplete)."""
+    with conn:
+        conn.execute("DELETE FROM entries")
+        for section in ('movies', 'shows'):
+            conn.executemany(
+                "INSERT INTO entries (section, title, year, rating, status, simkl_id, tmdb_id, ids) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (
+                        section, entry.get('title', ''), _year_to_db(entry.get('year')), entry.get('rating'),
+                        entry.get('to'), (entry.get('ids') or {}).get('simkl'), (entry.get('ids') or {}).get('tmdb'),
+                        json.dumps(entry.get('ids'))
+                    )
+                    for entry in backup[section]
+                )
+            )
+
+        if watched_shows is None:
+            return
+        conn.execute("DELETE FROM watched_shows")
+        conn.execute("DELETE FROM watched_episodes")
+        for position, show in enumerate(watched_shows):
+            key = show_key(show)
+            conn.execute(
+                "INSERT OR REPLACE INTO watched_shows (show_key, position, title, year, ids) VALUES (?, ?, ?, ?, ?)",
+                (key, position, show.get('title', ''), _year_to_db(show.get('year')), json.dumps(show.get('ids')))
+            )
+            episodes = EpisodeSet.from_history(show.get('seasons', []))
+            conn.executemany(
+                "INSERT OR IGNORE INTO watched_episodes (show_key, season, episode) VALUES (?, ?, ?)",
+                ((key, season['number'], ep['number']) for season in episodes.to_history() for ep in season['episodes'])
+            )
+
+def iter_entries(conn: sqlite3.Connection, section: str, status: str | None = None,
+                 rated: bool = False) -> Iterator[MediaEntry]:
+    """Stream the entries of a section in export order, optionally only one status or only rated
+    entries (highest rating first)."""
+    query = "SELECT title, rating, year, status, ids FROM entries WHERE section = ?"
+    params = [section]
+    if status is not None:
+        query += " AND status = ?"
+        params.append(status)
+    if rated:
+        query += " AND rating IS NOT NULL ORDER BY rating DESC, id"
+    else:
+        query += " ORDER BY id"
+
+    for title, rating, year, status, ids in conn.execute(query, params):
+        yield MediaEntry(title=title, rating=rating, year=_year_from_db(year), to=status, ids=json.loads(ids))
+
+def load_backup(conn: sqlite3.Connection) -> SimklBackup:
+    """Rebuild the Simkl backup from the export."""
+    return SimklBackup(movies=list(iter_entries(conn, 'movies')), shows=list(iter_entries(conn, 'shows')))
+
+def load_watched_shows(conn: sqlite3.Connection) -> List[Dict[str, Any]]:
+    """Rebuild the watched_episodes.json content (Simkl history shows) from the export."""
+    shows = []
+    for key, title, year, ids in conn.execute("SELECT show_key, title, year, ids FROM watched_shows ORDER BY position"):
+        rows = conn.execute("SELECT season, episode FROM watched_episodes WHERE show_key = ?", (key,))
+        episodes = EpisodeSet.from_episodes({"season": season, "episode": episode} for season, episode in rows)
+        shows.append({"title": title, "year": _year_from_db(year), "ids": json.loads(ids), "seasons": episodes.to_history()})
+    return shows
+
+def main():
+    parser = argparse.ArgumentParser(description="Work with the SQLite export of the scraper's output")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    to_json = subparsers.add_parser("to-json", help="Rebuild the Simkl JSON backup from the export")
+    to_json.add_argument("output", nargs="?", default=OUTPUT_FILE)
+    args = parser.parse_args()
+
+    conn = connect()
+    try:
+        backup = load_backup(conn)
+    finally:
+        conn.close()
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(backup, f, ensure_ascii=False, indent=JSON_INDENT)
+    print(f"Backup with {len(backup['movies'])} movies and {len(backup['shows'])} shows written to {args.output}")
+
+if __name__ == "__main__":
+    main()
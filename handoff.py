@@ -0,0 +1,93 @@
+"""Live handoff from the scraper to the importer through an append-only JSON Lines feed.
+
+With LIVE_HANDOFF enabled, scraper.py appends every resolved entry and every show's new watched
+episodes to HANDOFF_FILE as soon as they are produced, and `importer.py --follow` tails the file
+and uploads them in batches while the scrape is still running, so a full sync takes roughly as
+long as the slower of the two instead of both back to back.
+
+Records: {"type": "start"}, {"type": "entry", "section": ..., "entry": ...},
+{"type": "episodes", "show": ...} and a final {"type": "end", "complete": ...}.
+"""
+import json
+import os
+import time
+
+from config import HANDOFF_FILE, HANDOFF_POLL_SECONDS
+from schemas import MediaEntry
+
+class HandoffWriter:
+    """Appends the scraper's output to the feed, flushing every record so a follower sees it right away."""
+
+    def __init__(self, path: str = HANDOFF_FILE):
+        # A new run replaces the previous feed, a follower notices the truncation and starts over
+        self.file = open(path, 'w', encoding='utf-8')
+        self.closed = False
+        self._write({"type": "start", "started_at": time.time()})
+
+    def _write(self, record: dict) -> None:
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.file.flush()
+
+    def publish_entry(self, section: str, entry: MediaEntry) -> None:
+        self._write({"type": "entry", "section": section, "entry": entry})
+
+    def publish_episodes(self, show: dict) -> None:
+        self._write({"type": "episodes", "show": show})
+
+    def close(self, complete: bool) -> None:
+        """Write the end record; complete is False when the scrape stopped before every title was processed."""
+        if self.closed:
+            return
+        self._write({"type": "end", "complete": complete})
+        self.file.close()
+        self.closed = True
+
+def follow(path: str = HANDOFF_FILE):
+    """Yield the feed's records as they are appended, up to and including the end record.
+
+    Yields None whenever nothing new arrived within HANDOFF_POLL_SECONDS, so the caller can tell
+    the feed is quiet.
+    """
+    while not os.path.exists(path):
+        time.sleep(HANDOFF_POLL_SECONDS)
+
+    with open(path, 'rb') as f:
+        start_line = None
+        partial = b""
+        while True:
+            line = f.readline()
+            if line.endswith(b"\n"):
+                line = partial + line
+                partial = b""
+                if start_line is None:
+                    start_line = line
+                record = json.loads(line)
+                yield record
+                if record["type"] == "end":
+                    return
+                continue
+
+            # Keep a half-written line until the rest of it arrives
+            partial += line
+            if _first_line(path) != start_line:
+                print("The scraper started a new run, following the new feed from the start")
+                f.seek(0)
+                start_line = None
+                partial = b""
+                continue
+            yield None
+            time.sleep(HANDOFF_POLL_SECONDS)
+
+def _first_line(path: str) -> bytes | None:
+    """The start record identifies a run, so a different first line means the feed was replaced."""
+    try:
+        with open(path, 'rb') as f:
+            line = f.readline()
+    except FileNotFoundError:
+        return None
+    return line if line.endswith(b"\n") else None
+
+def remove_feed(path: str = HANDOFF_FILE) -> None:
+    """Remove a fully imported feed, so a later --follow waits for the next scrape instead of replaying it."""
+    if os.path.exists(path):
+        os.remove(path)
@@ -0,0 +1,104 @@
+"""HTTP response cache for the taste.io episodes and continue-watching endpoints.
+
+Stores the ETag/Last-Modified validators and a SHA-256 hash of the last body per URL and sends
+conditional requests, so callers can keep their already parsed copy when the server answers
+304 Not Modified or returns the exact same body, instead of parsing and saving it again.
+"""
+import hashlib
+import json
+import os
+import threading
+
+from config import HTTP_RESPONSE_CACHE
+from transport import http_request
+
+# Validators and body hashes per URL (the bodies themselves live in the regular caches)
+HTTP_CACHE_FILE = "cache_http.json"
+
+_lock = threading.Lock()
+_entries = None
+stats = {"requests": 0, "not_modified": 0, "unchanged": 0, "bytes_saved": 0}
+
+def _load_entries() -> dict:
+    global _entries
+    if _entries is None:
+        _entries = {}
+        if os.path.exists(HTTP_CACHE_FILE):
+            try:
+                with open(HTTP_CACHE_FILE, 'r', encoding='utf-8') as f:
+                    _entries = json.load(f)
+            except Exception as e:
+                print(f"Error loading HTTP response cache: {e}")
+    return _entries
+
+def _save_entries() -> None:
+    tmp_path = f"{HTTP_CACHE_FILE}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(_entries, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, HTTP_CACHE_FILE)
+
+def get_extra(url: str) -> dict:
+    """Return the values the caller stored for the URL with set_extra (e.g. a page's total)."""
+    with _lock:
+        return dict(_load_entries().get(url, {}).get("extra", {}))
+
+def set_extra(url: str, **values) -> None:
+    with _lock:
+        entry = _load_entries().get(url)
+        if entry is not None:
+            entry.setdefault("extra", {}).update(values)
+            _save_entries()
+
+def conditional_get(url: str, headers: dict | None = None, have_copy: bool = True):
+    """GET the URL, revalidating the previous response when the caller still has its parsed copy.
+
+    Returns None when the resource is unchanged (304 or a body with the same hash), otherwise the
+    response, which has already been checked with raise_for_status().
+    """
+    if not HTTP_RESPONSE_CACHE:
+        response = http_request("GET", url, headers=headers)
+        response.raise_for_status()
+        return response
+
+    headers = dict(headers or {})
+    with _lock:
+        entry = dict(_load_entries().get(url, {}))
+    if have_copy:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    response = http_request("GET", url, headers=headers)
+    with _lock:
+        stats["requests"] += 1
+    if response.status_code == 304 and have_copy and entry:
+        with _lock:
+            stats["not_modified"] += 1
+            stats["bytes_saved"] += entry.get("size", 0)
+        return None
+    response.raise_for_status()
+
+    body_hash = hashlib.sha256(response.content).hexdigest()
+    unchanged = have_copy and entry.get("sha256") == body_hash
+    with _lock:
+        _load_entries()[url] = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "sha256": body_hash,
+            "size": len(response.content),
+            "extra": entry.get("extra", {}),
+        }
+        if unchanged:
+            stats["unchanged"] += 1
+        _save_entries()
+    if unchanged:
+        return None
+    return response
+
+def print_http_cache_summary() -> None:
+    """Print how many conditional requests avoided a download or a re-parse."""
+    if not stats["requests"]:
+        return
+    print(f"HTTP response cache: {stats['requests']} requests, {stats['not_modified']} not modified, "
+          f"{stats['unchanged']} unchanged bodies, {stats['bytes_saved'] / 1024:.1f} KiB not downloaded")
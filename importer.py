@@ -1,17 +1,28 @@
+import argparse
 import json
 import sys
 import os
+import threading
 import requests
 from typing import Dict, List, Any
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 
+import export_db
+import handoff
 from config import (
-    OUTPUT_FILE, SIMKL_CLIENT_ID,
-    SIMKL_IMPORT_ENDPOINT, SIMKL_ACCESS_TOKEN,
-    SIMKL_API_HEADERS, SIMKL_ADD_TO_LIST_ENDPOINT,
-    SIMKL_HISTORY_ENDPOINT
+    OUTPUT_FILE, SIMKL_CLIENT_ID, SIMKL_ACCESS_TOKEN,
+    SIMKL_API_HEADERS, IMPORT_PLANNER, PROFILE_DIR, EXPORT_DB_FILE,
+    HANDOFF_FILE, HANDOFF_BATCH_SIZE
 )
-from schemas import SimklBackup, MediaEntry
+from schemas import SimklBackup, MediaEntry, PlannedCall
+from planner import plan_import, plan_legacy_import, chunk_plan
+from tune import load_tuning
+from journal import ImportJournal
+from episodes import record_sent_episodes
+from transport import http_request
+from profiling import profiler
+from cache import SimklApiLimitException
 
 def load_backup(file_path: str) -> SimklBackup:
     """Load the backup file created by the scraper."""
@@ -66,56 +77,6 @@ def group_by_rating(backup: SimklBackup) -> Dict[float, Dict[str, List[Dict[str,
 
     return rating_groups
 
-def send_ratings_to_simkl(rating_groups: Dict[float, Dict[str, List[Dict[str, Any]]]]) -> None:
-    """Send ratings to Simkl API, one request per rating value.
-    Also sends each group to the add-to-list endpoint."""
-    if not SIMKL_CLIENT_ID or not SIMKL_ACCESS_TOKEN:
-        print("Error: SIMKL_CLIENT_ID or SIMKL_ACCESS_TOKEN not set. Please configure them in config.py")
-        sys.exit(1)
-
-    headers = SIMKL_API_HEADERS.copy()
-
-    # Process each rating group
-    for rating, formatted_items in rating_groups.items():
-        if not formatted_items['movies'] and not formatted_items['shows']:
-            continue
-
-        total_items = len(formatted_items['movies']) + len(formatted_items['shows'])
-        print(f"Sending {total_items} items with rating {rating}...")
-
-        # 1. Send to ratings endpoint with rating parameter
-        ratings_endpoint = f"{SIMKL_IMPORT_ENDPOINT}?rating={rating}"
-        try:
-            response = requests.post(
-                ratings_endpoint,
-                headers=headers,
-                json=formatted_items
-            )
-            response.raise_for_status()
-            print(f"Successfully sent {total_items} items with rating {rating} to ratings endpoint")
-        except requests.exceptions.RequestException as e:
-            print(f"Error sending items with rating {rating} to ratings endpoint: {e}")
-            if hasattr(e, 'response') and e.response:
-                print(f"Response status: {e.response.status_code}")
-                print(f"Response body: {e.response.text}")
-
-        # 2. Send to add-to-list endpoint with proper format (movies and shows already separated)
-        try:
-            print(f"Adding {total_items} items to the completed list...")
-            add_response = requests.post(
-                SIMKL_ADD_TO_LIST_ENDPOINT,
-                headers=headers,
-                json=formatted_items
-            )
-            add_response.raise_for_status()
-            print(f"Successfully added {total_items} items to the completed list")
-            print(f"Movies: {len(formatted_items['movies'])}, Shows: {len(formatted_items['shows'])}")
-        except requests.exceptions.RequestException as e:
-            print(f"Error adding items to the completed list: {e}")
-            if hasattr(e, 'response') and e.response:
-                print(f"Response status: {e.response.status_code}")
-                print(f"Response body: {e.response.text}")
-
 def extract_plantowatch_items(backup: SimklBackup) -> Dict[str, List[Dict[str, Any]]]:
     """Extract items with 'plantowatch' status from the backup.
     Returns a dictionary with 'movies' and 'shows' keys."""
@@ -136,36 +97,6 @@ def extract_plantowatch_items(backup: SimklBackup) -> Dict[str, List[Dict[str, A
 
     return plantowatch_items
 
-def send_plantowatch_to_simkl(plantowatch_items: Dict[str, List[Dict[str, Any]]]) -> None:
-    """Send plantowatch items to Simkl API using the add-to-list endpoint.
-    Expects a dictionary with 'movies' and 'shows' keys."""
-    if not SIMKL_CLIENT_ID or not SIMKL_ACCESS_TOKEN:
-        print("Error: SIMKL_CLIENT_ID or SIMKL_ACCESS_TOKEN not set. Please configure them in config.py")
-        sys.exit(1)
-
-    total_items = len(plantowatch_items['movies']) + len(plantowatch_items['shows'])
-    if total_items == 0:
-        print("No plantowatch items to send.")
-        return
-
-    headers = SIMKL_API_HEADERS.copy()
-
-    print(f"Sending {total_items} items to the plantowatch list...")
-    try:
-        response = requests.post(
-            SIMKL_ADD_TO_LIST_ENDPOINT,
-            headers=headers,
-            json=plantowatch_items
-        )
-        response.raise_for_status()
-        print(f"Successfully added {total_items} items to the plantowatch list")
-        print(f"Movies: {len(plantowatch_items['movies'])}, Shows: {len(plantowatch_items['shows'])}")
-    except requests.exceptions.RequestException as e:
-        print(f"Error adding items to the plantowatch list: {e}")
-        if hasattr(e, 'response') and e.response:
-            print(f"Response status: {e.response.status_code}")
-            print(f"Response body: {e.response.text}")
-
 def extract_watching_items(backup: SimklBackup) -> Dict[str, List[Dict[str, Any]]]:
     """Extract items with 'watching' status from the backup.
     Returns a dictionary with 'movies' and 'shows' keys."""
@@ -186,46 +117,12 @@ def extract_watching_items(backup: SimklBackup) -> Dict[str, List[Dict[str, Any]
 
     return watching_items
 
-def send_watching_to_simkl(watching_items: Dict[str, List[Dict[str, Any]]]) -> None:
-    """Send watching items to Simkl API using the add-to-list endpoint.
-    Expects a dictionary with 'movies' and 'shows' keys."""
-    if not SIMKL_CLIENT_ID or not SIMKL_ACCESS_TOKEN:
-        print("Error: SIMKL_CLIENT_ID or SIMKL_ACCESS_TOKEN not set. Please configure them in config.py")
-        sys.exit(1)
-
-    total_items = len(watching_items['movies']) + len(watching_items['shows'])
-    if total_items == 0:
-        print("No watching items to send.")
-        return
-
-    headers = SIMKL_API_HEADERS.copy()
-
-    print(f"Sending {total_items} items to the watching list...")
-    try:
-        response = requests.post(
-            SIMKL_ADD_TO_LIST_ENDPOINT,
-            headers=headers,
-            json=watching_items
-        )
-        response.raise_for_status()
-        print(f"Successfully added {total_items} items to the watching list")
-        print(f"Movies: {len(watching_items['movies'])}, Shows: {len(watching_items['shows'])}")
-    except requests.exceptions.RequestException as e:
-        print(f"Error adding items to the watching list: {e}")
-        if hasattr(e, 'response') and e.response:
-            print(f"Response status: {e.response.status_code}")
-            print(f"Response body: {e.response.text}")
-
-def send_watched_episodes_to_simkl() -> None:
-    """Send watched episodes data to Simkl history endpoint in a single request."""
-    if not SIMKL_CLIENT_ID or not SIMKL_ACCESS_TOKEN:
-        print("Error: SIMKL_CLIENT_ID or SIMKL_ACCESS_TOKEN not set. Please configure them in config.py")
-        sys.exit(1)
-
+def load_watched_episodes() -> List[Dict[str, Any]]:
+    """Load the shows with watched episodes written by the scraper, skipping shows without episodes."""
     # Check if watched episodes file exists
     if not os.path.exists("watched_episodes.json"):
         print("No watched episodes data found. Remember if the Scraper.py script didn't create the 'watched_episodes.json' file,\n you need to run the Scraper.py script first/again. \nBecause it didn't manage to get all the episodes, probably because of the rate limit of Simkl.")
-        return
+        return []
 
     # Load watched episodes data
     try:
@@ -233,58 +130,101 @@ def send_watched_episodes_to_simkl() -> None:
             watched_episodes = json.load(f)
     except Exception as e:
         print(f"Error loading watched episodes data: {e}")
-        return
+        return []
 
     if not watched_episodes:
         print("No watched episodes data found.")
-        return
+        return []
 
     # Filter out shows with no seasons or episodes
     valid_shows = [show for show in watched_episodes if show.get("seasons")]
 
     if not valid_shows:
         print("No valid shows with episodes found in the 'watched_episodes.json' file.")
-        return
-
-    # Create the payload with all shows in a single request
-    payload = {"shows": valid_shows}
-
-    headers = SIMKL_API_HEADERS.copy()
+    return valid_shows
 
-    print(f"Sending watched episodes data for {len(valid_shows)} shows to Simkl in a single request...")
+def send_planned_call(number: int, plan: List[PlannedCall], journal: ImportJournal, lock: threading.Lock) -> None:
+    """Send one planned call unless the journal records it as already accepted by Simkl."""
+    call = plan[number - 1]
+    if journal.is_completed(call):
+        print(f"[{number}/{len(plan)}] {call['description']}: already sent in a previous run, skipping")
+        return
 
+    print(f"[{number}/{len(plan)}] {call['description']}...")
     try:
-        response = requests.post(
-            SIMKL_HISTORY_ENDPOINT,
-            headers=headers,
-            json=payload
+        response = http_request(
+            "POST",
+            call['endpoint'],
+            headers=SIMKL_API_HEADERS.copy(),
+            json=call['payload']
         )
         response.raise_for_status()
-        print(f"Successfully sent watched episodes for all {len(valid_shows)} shows")
+        print(f"Successfully sent {call['items']} items")
+        # The journal and the sent episodes cache are rewritten on every update, one call at a time
+        with lock:
+            journal.mark_completed(call)
+            if call['kind'] == 'history':
+                # Remember what Simkl accepted so the scraper only emits newly watched episodes next time
+                record_sent_episodes(call['payload']['shows'])
     except requests.exceptions.RequestException as e:
-        print(f"Error sending watched episodes: {e}")
-        if hasattr(e, 'response') and e.response:
+        print(f"Error while {call['description'][0].lower() + call['description'][1:]}: {e}")
+        if getattr(e, 'response', None) is not None:
             print(f"Response status: {e.response.status_code}")
             print(f"Response body: {e.response.text}")
 
-def main():
-    # Load the backup file
-    backup_file = OUTPUT_FILE
-    print(f"Loading backup from {backup_file}...")
-    backup = load_backup(backup_file)
+def send_planned_calls(plan: List[PlannedCall], journal: ImportJournal) -> None:
+    """Send the calls produced by the import planner, skipping those the journal records as already
+    accepted by Simkl. Calls are sent in order, or with the tuned number of them in parallel."""
+    if not SIMKL_CLIENT_ID or not SIMKL_ACCESS_TOKEN:
+        print("Error: SIMKL_CLIENT_ID or SIMKL_ACCESS_TOKEN not set. Please configure them in config.py")
+        sys.exit(1)
 
+    _, concurrency = load_tuning()
+    lock = threading.Lock()
+    if concurrency <= 1:
+        for number in range(1, len(plan) + 1):
+            send_planned_call(number, plan, journal, lock)
+        return
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(send_planned_call, number, plan, journal, lock) for number in range(1, len(plan) + 1)]
+        try:
+            for future in futures:
+                future.result()
+        except SimklApiLimitException:
+            # Don't start the calls still waiting, Simkl would refuse them anyway
+            for future in futures:
+                future.cancel()
+            raise
+
+def parse_args(argv: List[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Import the scraper's backup into Simkl")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--resume", action="store_true",
+                      help="Skip requests an interrupted run already got accepted (default)")
+    mode.add_argument("--restart", action="store_true",
+                      help="Forget the import journal and send everything again")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--from-db", action="store_true",
+                        help=f"Read the entries and episodes from the SQLite export ({EXPORT_DB_FILE}) instead of the JSON files")
+    source.add_argument("--follow", action="store_true",
+                        help=f"Upload the scraper's live feed ({HANDOFF_FILE}) in batches while it is being written")
+    parser.add_argument("--profile", action="store_true",
+                        help=f"Profile each stage with cProfile and tracemalloc and write the results to {PROFILE_DIR}/")
+    return parser.parse_args(argv)
+
+def split_backup(backup: SimklBackup) -> tuple:
+    """Split the backup into the rated items (sorted by rating) and the plantowatch and watching buckets."""
     # Extract plantowatch items
     plantowatch_items = extract_plantowatch_items(backup)
-    print(f"Found {len(plantowatch_items['movies']) + len(plantowatch_items['shows'])} items with 'plantowatch' status")
 
     # Extract watching items
     watching_items = extract_watching_items(backup)
-    print(f"Found {len(watching_items['movies']) + len(watching_items['shows'])} items with 'watching' status")
 
-    # Filter out plantowatch and watching items from the backup for rating processing
+    # Keep only rated items for rating processing (rated shows can also be in the watching list)
     rated_backup = SimklBackup(
-        movies=[movie for movie in backup['movies'] if movie.get('to') not in ['plantowatch', 'watching']],
-        shows=[show for show in backup['shows'] if show.get('to') not in ['plantowatch', 'watching']]
+        movies=[movie for movie in backup['movies'] if movie.get('rating') is not None],
+        shows=[show for show in backup['shows'] if show.get('rating') is not None]
     )
 
     # Check if ratings are sorted
@@ -298,6 +238,30 @@ def main():
     else:
         print("Ratings are already sorted.")
 
+    return rated_backup, plantowatch_items, watching_items
+
+def split_export(conn) -> tuple:
+    """Stream the same buckets as split_backup straight from the indexed SQLite export."""
+    rated_backup = SimklBackup(
+        movies=list(export_db.iter_entries(conn, 'movies', rated=True)),
+        shows=list(export_db.iter_entries(conn, 'shows', rated=True))
+    )
+    plantowatch_items = {
+        'movies': list(export_db.iter_entries(conn, 'movies', status='plantowatch')),
+        'shows': list(export_db.iter_entries(conn, 'shows', status='plantowatch'))
+    }
+    watching_items = {
+        'movies': list(export_db.iter_entries(conn, 'movies', status='watching')),
+        'shows': list(export_db.iter_entries(conn, 'shows', status='watching'))
+    }
+    return rated_backup, plantowatch_items, watching_items
+
+def build_plan(rated_backup: SimklBackup, plantowatch_items: Dict[str, List[Dict[str, Any]]],
+               watching_items: Dict[str, List[Dict[str, Any]]], watched_shows: List[Dict[str, Any]]) -> List[PlannedCall]:
+    """Group the rated items by rating and plan the Simkl calls for them, the list buckets and the episodes."""
+    print(f"Found {len(plantowatch_items['movies']) + len(plantowatch_items['shows'])} items with 'plantowatch' status")
+    print(f"Found {len(watching_items['movies']) + len(watching_items['shows'])} items with 'watching' status")
+
     # Group items by rating
     print("Grouping items by rating...")
     rating_groups = group_by_rating(rated_backup)
@@ -306,24 +270,123 @@ def main():
     for rating, items in sorted(rating_groups.items(), reverse=True):
         print(f"Rating {rating}: {len(items)} items")
 
-    # Send ratings to Simkl
-    print("\nSending ratings to Simkl...")
-    send_ratings_to_simkl(rating_groups)
-
-    # Send plantowatch items to Simkl
-    print("\nSending plantowatch items to Simkl...")
-    print(f"Found {len(plantowatch_items['movies'])} movies and {len(plantowatch_items['shows'])} shows with 'plantowatch' status")
-    send_plantowatch_to_simkl(plantowatch_items)
+    legacy_plan = plan_legacy_import(rating_groups, plantowatch_items, watching_items, watched_shows)
+    if IMPORT_PLANNER:
+        # Merge everything into the fewest possible Simkl calls
+        plan = plan_import(rating_groups, plantowatch_items, watching_items, watched_shows)
+        print(f"\nPlanned {len(plan)} Simkl calls (instead of {len(legacy_plan)})")
+    else:
+        plan = legacy_plan
+        print(f"\nPlanned {len(plan)} Simkl calls")
+
+    chunk_size, _ = load_tuning()
+    if chunk_size and any(call['items'] > chunk_size for call in plan):
+        plan = chunk_plan(plan, chunk_size)
+        print(f"Split into {len(plan)} requests of at most {chunk_size} items")
+    return plan
+
+def load_buckets(from_db: bool) -> tuple:
+    """Load the rated/plantowatch/watching buckets and the watched shows from the export or the JSON files."""
+    if from_db:
+        # Stream only the needed rows from the indexed export
+        print(f"Loading entries from {EXPORT_DB_FILE}...")
+        conn = export_db.connect()
+        try:
+            with profiler.stage("serialization"):
+                return split_export(conn), export_db.load_watched_shows(conn)
+        finally:
+            conn.close()
 
-    # Send watching items to Simkl
-    print("\nSending watching items to Simkl...")
-    send_watching_to_simkl(watching_items)
+    # Load the backup file
+    backup_file = OUTPUT_FILE
+    print(f"Loading backup from {backup_file}...")
+    with profiler.stage("serialization"):
+        backup = load_backup(backup_file)
+        watched_shows = load_watched_episodes()
+    with profiler.stage("planning"):
+        return split_backup(backup), watched_shows
+
+def follow_handoff(journal: ImportJournal) -> tuple:
+    """Upload the scraper's live feed in batches of HANDOFF_BATCH_SIZE records until its end record.
+    Returns every call planned along the way and whether the scraper got through every title.
+
+    Batches are cut at fixed record counts only, never when the feed goes quiet, so following the
+    same feed again rebuilds the same calls and the journal skips the ones already accepted.
+    """
+    all_calls = []
+    complete = False
+    batch = SimklBackup(movies=[], shows=[])
+    shows = []
+
+    def upload_batch():
+        if not batch['movies'] and not batch['shows'] and not shows:
+            return
+        plan = build_plan(*split_backup(batch), list(shows))
+        all_calls.extend(plan)
+        send_planned_calls(plan, journal)
+        batch['movies'], batch['shows'] = [], []
+        shows.clear()
+
+    for record in handoff.follow():
+        if record is None:
+            continue
+        if record['type'] == 'entry':
+            batch[record['section']].append(record['entry'])
+        elif record['type'] == 'episodes':
+            shows.append(record['show'])
+        elif record['type'] == 'end':
+            upload_batch()
+            complete = record['complete']
+            if not complete:
+                print("The scraper stopped before processing every title, run it again to continue the feed.")
+
+        if len(batch['movies']) + len(batch['shows']) + len(shows) >= HANDOFF_BATCH_SIZE:
+            upload_batch()
+    return all_calls, complete
+
+def main(argv: List[str] | None = None):
+    args = parse_args(argv)
+    if args.profile:
+        profiler.start("importer")
 
-    # Send watched episodes to Simkl
-    print("\nSending watched episodes to Simkl...")
-    send_watched_episodes_to_simkl()
+    try:
+        journal = ImportJournal()
+        if args.restart:
+            journal.clear()
+
+        feed_complete = True
+        if args.follow:
+            print(f"Following the scraper's live feed in {HANDOFF_FILE}...")
+        else:
+            buckets, watched_shows = load_buckets(args.from_db)
+            with profiler.stage("planning"):
+                plan = build_plan(*buckets, watched_shows)
 
-    print("\nImport process completed.")
+        try:
+            with profiler.stage("upload"):
+                if args.follow:
+                    plan, feed_complete = follow_handoff(journal)
+                else:
+                    send_planned_calls(plan, journal)
+        except SimklApiLimitException as api_limit_exc:
+            print(f"\n{api_limit_exc}")
+            print("Import stopped early, run the importer again once the limit has reset to resume where it stopped.")
+            return
+
+        if not feed_complete and all(journal.is_completed(call) for call in plan):
+            # The resumed scrape publishes the checkpointed titles again, the journal lets them be skipped
+            print("\nEvery batch so far was accepted. The journal is kept until the scraper finishes the feed.")
+        elif all(journal.is_completed(call) for call in plan):
+            # Everything was accepted, the next run starts from scratch
+            journal.clear()
+            if args.follow:
+                handoff.remove_feed()
+            print("\nImport process completed.")
+        else:
+            print("\nImport finished with failed requests. Run it again to resume from the first failed one, "
+                  "or with --restart to send everything again.")
+    finally:
+        profiler.report()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
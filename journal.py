@@ -0,0 +1,51 @@
+"""Import journal: remembers which Simkl requests of an unfinished import were already accepted."""
+import hashlib
+import json
+import os
+import time
+
+from config import IMPORT_JOURNAL_FILE
+from schemas import PlannedCall
+
+def call_hash(call: PlannedCall) -> str:
+    """Hash a call's endpoint and payload, so a changed payload is never mistaken for a sent one."""
+    content = json.dumps([call['endpoint'], call['payload']], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+class ImportJournal:
+    """Completed requests keyed by call_hash, persisted after every accepted request."""
+
+    def __init__(self, path: str = IMPORT_JOURNAL_FILE):
+        self.path = path
+        self.completed = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.completed = json.load(f).get('completed', {})
+            except Exception as e:
+                print(f"Error loading import journal, starting from scratch: {e}")
+        if self.completed:
+            print(f"Resuming import: {len(self.completed)} requests were already accepted in a previous run")
+
+    def is_completed(self, call: PlannedCall) -> bool:
+        return call_hash(call) in self.completed
+
+    def mark_completed(self, call: PlannedCall) -> None:
+        self.completed[call_hash(call)] = {
+            'kind': call['kind'],
+            'description': call['description'],
+            'completed_at': time.time()
+        }
+        self._save()
+
+    def clear(self) -> None:
+        self.completed = {}
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _save(self) -> None:
+        # Write to a temporary file first so a crash never leaves a truncated journal
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'completed': self.completed}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
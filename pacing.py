@@ -0,0 +1,107 @@
+"""Adaptive per-host request pacing shared by the Selenium and HTTP fetchers.
+
+Each host gets an AIMD controller: the delay between requests shrinks by a fixed step after
+every healthy response and is multiplied when the host throttles us (429/503), serves an
+anti-bot page or suddenly answers much slower than usual.
+"""
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+from config import (
+    ADAPTIVE_PACING, PACING_JITTER_FLOOR, MIN_DELAY, MAX_DELAY,
+    PACING_MIN_DELAY, PACING_MAX_DELAY, PACING_DECREASE_STEP, PACING_BACKOFF_FACTOR
+)
+
+# Status codes that mean the host wants us to slow down (403 is how taste.io's anti-bot answers)
+THROTTLE_STATUS_CODES = (403, 429, 503)
+# A response this many times slower than the running average counts as congestion
+SLOW_RESPONSE_FACTOR = 3.0
+
+class HostPacer:
+    """AIMD pacing state for a single host."""
+
+    def __init__(self, host: str):
+        self.host = host
+        self.delay = MIN_DELAY
+        self.latency = None  # Exponentially weighted average of response times
+        self.last_request = 0.0
+        self.not_before = 0.0  # Set from Retry-After headers
+        self.requests = 0
+        self.backoffs = 0
+        self.lock = threading.Lock()
+
+    def wait(self) -> None:
+        """Sleep until the next request to this host is allowed."""
+        if not ADAPTIVE_PACING:
+            return
+
+        with self.lock:
+            # Keep some jitter so requests don't arrive on a perfectly regular beat
+            delay = self.delay * random.uniform(0.8, 1.2)
+            if PACING_JITTER_FLOOR:
+                delay = max(delay, random.uniform(MIN_DELAY, MAX_DELAY))
+            now = time.monotonic()
+            # Reserve the slot while holding the lock so concurrent callers queue up behind each other
+            start = max(now, self.last_request + delay, self.not_before)
+            self.last_request = start
+        if start > now:
+            time.sleep(start - now)
+
+    def reset(self) -> None:
+        """Forget the learned delay and latency and start from the settled PACING_MIN_DELAY, so
+        measurements taken one after another (see tune.py) all start from the same state.
+        A pending Retry-After is kept."""
+        with self.lock:
+            self.delay = PACING_MIN_DELAY
+            self.latency = None
+
+    def record(self, latency: float, status_code: int | None = None, blocked: bool = False,
+               retry_after: float | None = None) -> None:
+        """Feed the outcome of a request back into the controller."""
+        with self.lock:
+            self.requests += 1
+            slow = self.latency is not None and latency > self.latency * SLOW_RESPONSE_FACTOR
+            self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+
+            if blocked or slow or status_code in THROTTLE_STATUS_CODES:
+                self.backoffs += 1
+                self.delay = min(max(self.delay, PACING_MIN_DELAY) * PACING_BACKOFF_FACTOR, PACING_MAX_DELAY)
+            else:
+                self.delay = max(self.delay - PACING_DECREASE_STEP, PACING_MIN_DELAY)
+
+            if retry_after:
+                self.not_before = max(self.not_before, time.monotonic() + retry_after)
+
+_pacers = {}
+_pacers_lock = threading.Lock()
+
+def get_pacer(url: str) -> HostPacer:
+    """Return the shared pacer for the URL's host."""
+    host = urlsplit(url).netloc
+    with _pacers_lock:
+        if host not in _pacers:
+            _pacers[host] = HostPacer(host)
+        return _pacers[host]
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Parse a Retry-After header given either in seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+def print_pacing_summary() -> None:
+    """Print the current delay and backoff count for every host contacted."""
+    if not ADAPTIVE_PACING:
+        return
+    for host, pacer in sorted(_pacers.items()):
+        print(f"Pacing {host}: {pacer.requests} requests, {pacer.backoffs} backoffs, current delay {pacer.delay:.2f}s")
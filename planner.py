@@ -0,0 +1,162 @@
+"""Plans the smallest set of Simkl API calls needed for an import.
+
+The legacy importer sends one ratings and one add-to-list request per rounded rating, plus an
+add-to-list request per status list. Simkl accepts a per-item "rating" on /sync/ratings and a
+per-item "to" on /sync/add-to-list, so everything fits in one call per endpoint.
+"""
+from typing import Dict, List, Any
+
+from config import (
+    SIMKL_IMPORT_ENDPOINT, SIMKL_ADD_TO_LIST_ENDPOINT, SIMKL_HISTORY_ENDPOINT,
+    SIMKL_PER_ITEM_RATINGS
+)
+from schemas import PlannedCall
+
+def _item_key(entry: Dict[str, Any]) -> tuple:
+    """Identify an entry by its Simkl ID, falling back to title and year."""
+    simkl_id = (entry.get('ids') or {}).get('simkl')
+    return (simkl_id,) if simkl_id else (entry.get('title'), entry.get('year'))
+
+def _count(payload: Dict[str, List]) -> int:
+    return sum(len(items) for items in payload.values())
+
+def plan_ratings(rating_groups: Dict[int, Dict[str, List[Dict[str, Any]]]]) -> List[PlannedCall]:
+    """Plan the ratings calls: a single call with per-item ratings, or one per rating value."""
+    calls = []
+    if SIMKL_PER_ITEM_RATINGS:
+        payload = {'movies': [], 'shows': []}
+        for rating, group in sorted(rating_groups.items(), reverse=True):
+            for section in ('movies', 'shows'):
+                payload[section].extend({**entry, 'rating': rating} for entry in group[section])
+        if _count(payload):
+            calls.append(PlannedCall(
+                kind='ratings',
+                description=f"Sending {_count(payload)} ratings",
+                endpoint=SIMKL_IMPORT_ENDPOINT,
+                payload=payload,
+                items=_count(payload)
+            ))
+        return calls
+
+    for rating, group in sorted(rating_groups.items(), reverse=True):
+        if _count(group):
+            calls.append(PlannedCall(
+                kind='ratings',
+                description=f"Sending {_count(group)} items with rating {rating}",
+                endpoint=f"{SIMKL_IMPORT_ENDPOINT}?rating={rating}",
+                payload=group,
+                items=_count(group)
+            ))
+    return calls
+
+def plan_list_additions(*item_groups: Dict[str, List[Dict[str, Any]]]) -> List[PlannedCall]:
+    """Plan a single add-to-list call for every group; each entry carries its own 'to' status."""
+    payload = {'movies': [], 'shows': []}
+    seen = set()
+    for group in item_groups:
+        for section in ('movies', 'shows'):
+            for entry in group.get(section, []):
+                key = (section, _item_key(entry))
+                if key not in seen:
+                    seen.add(key)
+                    payload[section].append(entry)
+
+    if not _count(payload):
+        return []
+    return [PlannedCall(
+        kind='list',
+        description=f"Adding {_count(payload)} items to their lists",
+        endpoint=SIMKL_ADD_TO_LIST_ENDPOINT,
+        payload=payload,
+        items=_count(payload)
+    )]
+
+def plan_history(watched_shows: List[Dict[str, Any]]) -> List[PlannedCall]:
+    """Plan the history call for watched episodes."""
+    if not watched_shows:
+        return []
+    return [PlannedCall(
+        kind='history',
+        description=f"Sending watched episodes for {len(watched_shows)} shows",
+        endpoint=SIMKL_HISTORY_ENDPOINT,
+        payload={'shows': watched_shows},
+        items=len(watched_shows)
+    )]
+
+def plan_import(rating_groups: Dict[int, Dict[str, List[Dict[str, Any]]]],
+                plantowatch_items: Dict[str, List[Dict[str, Any]]],
+                watching_items: Dict[str, List[Dict[str, Any]]],
+                watched_shows: List[Dict[str, Any]]) -> List[PlannedCall]:
+    """Turn the group_by_rating output, the list buckets and the watched episodes into the minimum set of calls."""
+    rated_items = {'movies': [], 'shows': []}
+    for group in rating_groups.values():
+        rated_items['movies'].extend(group['movies'])
+        rated_items['shows'].extend(group['shows'])
+
+    return (
+        plan_ratings(rating_groups)
+        + plan_list_additions(rated_items, plantowatch_items, watching_items)
+        + plan_history(watched_shows)
+    )
+
+def plan_legacy_import(rating_groups: Dict[int, Dict[str, List[Dict[str, Any]]]],
+                       plantowatch_items: Dict[str, List[Dict[str, Any]]],
+                       watching_items: Dict[str, List[Dict[str, Any]]],
+                       watched_shows: List[Dict[str, Any]]) -> List[PlannedCall]:
+    """Plan the calls the unplanned importer makes: a ratings and an add-to-list call per rating value,
+    one add-to-list call per status list and the history call."""
+    calls = []
+    for rating, group in sorted(rating_groups.items(), reverse=True):
+        if not _count(group):
+            continue
+        calls.append(PlannedCall(
+            kind='ratings',
+            description=f"Sending {_count(group)} items with rating {rating}",
+            endpoint=f"{SIMKL_IMPORT_ENDPOINT}?rating={rating}",
+            payload=group,
+            items=_count(group)
+        ))
+        calls.append(PlannedCall(
+            kind='list',
+            description=f"Adding {_count(group)} items with rating {rating} to the completed list",
+            endpoint=SIMKL_ADD_TO_LIST_ENDPOINT,
+            payload=group,
+            items=_count(group)
+        ))
+
+    for status, items in (('plantowatch', plantowatch_items), ('watching', watching_items)):
+        if _count(items):
+            calls.append(PlannedCall(
+                kind='list',
+                description=f"Adding {_count(items)} items to the {status} list",
+                endpoint=SIMKL_ADD_TO_LIST_ENDPOINT,
+                payload=items,
+                items=_count(items)
+            ))
+
+    return calls + plan_history(watched_shows)
+
+def split_call(call: PlannedCall, chunk_size: int) -> List[PlannedCall]:
+    """Split a call into calls of at most chunk_size items each, keeping the item order (0 = no limit)."""
+    if chunk_size <= 0 or call['items'] <= chunk_size:
+        return [call]
+
+    entries = [(section, entry) for section, items in call['payload'].items() for entry in items]
+    chunks = [entries[i:i + chunk_size] for i in range(0, len(entries), chunk_size)]
+    calls = []
+    for number, chunk in enumerate(chunks, 1):
+        payload = {section: [] for section in call['payload']}
+        for section, entry in chunk:
+            payload[section].append(entry)
+        calls.append(PlannedCall(
+            kind=call['kind'],
+            description=f"{call['description']} (part {number}/{len(chunks)})",
+            endpoint=call['endpoint'],
+            payload=payload,
+            items=len(chunk)
+        ))
+    return calls
+
+def chunk_plan(plan: List[PlannedCall], chunk_size: int) -> List[PlannedCall]:
+    """Apply split_call to every call of a plan."""
+    return [part for call in plan for part in split_call(call, chunk_size)]
@@ -0,0 +1,96 @@
+"""Per-stage CPU and memory profiling for the scraper and the importer (enabled with --profile).
+
+Each stage (pagination, resolution, episodes, serialization, upload) gets its own cProfile
+profile, dumped as a pstats .prof file that flamegraph tools such as flameprof, snakeviz or
+tuna can read, plus a text file with the top allocation sites recorded by tracemalloc.
+A stage can be entered many times (e.g. once per show); its measurements are accumulated.
+The net memory of every entry is taken from tracemalloc's running total, while the allocation
+sites come from snapshots of only the first SAMPLED_ENTRIES entries of a stage, since a snapshot
+costs time proportional to the whole heap.
+"""
+import cProfile
+import os
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+
+from config import PROFILE_DIR
+
+# Number of allocation sites written per stage
+TOP_ALLOCATIONS = 25
+# Number of entries per stage whose allocation sites are recorded with snapshots
+SAMPLED_ENTRIES = 5
+
+class StageProfiler:
+    """Collects a CPU profile, wall time and allocation diff per named stage."""
+
+    def __init__(self):
+        self.enabled = False
+        self.run_name = None
+        self.active_stage = None
+        self.profiles = {}
+        self.wall_times = Counter()
+        self.entries = Counter()
+        self.allocations = {}
+        self.net_memory = Counter()
+
+    def start(self, program: str) -> None:
+        """Enable profiling for this run."""
+        self.enabled = True
+        self.run_name = f"{program}_{time.strftime('%Y%m%d-%H%M%S')}"
+        tracemalloc.start(10)
+        print(f"Profiling enabled, results will be written to {PROFILE_DIR}/")
+
+    @contextmanager
+    def stage(self, name: str):
+        """Attribute everything that runs inside the block to the stage.
+        Nested stages are attributed to the outer one, since only one profiler can run at a time."""
+        if not self.enabled or self.active_stage is not None:
+            yield
+            return
+
+        profile = self.profiles.setdefault(name, cProfile.Profile())
+        allocations = self.allocations.setdefault(name, Counter())
+        self.active_stage = name
+        before = tracemalloc.take_snapshot() if self.entries[name] < SAMPLED_ENTRIES else None
+        memory_before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            self.wall_times[name] += time.perf_counter() - start
+            self.net_memory[name] += tracemalloc.get_traced_memory()[0] - memory_before
+            self.entries[name] += 1
+            if before is not None:
+                for stat in tracemalloc.take_snapshot().compare_to(before, 'lineno'):
+                    if stat.size_diff:
+                        allocations[str(stat.traceback[0])] += stat.size_diff
+            self.active_stage = None
+
+    def report(self) -> None:
+        """Write the per-stage dumps and print a summary."""
+        if not self.enabled or not self.profiles:
+            return
+
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        print("\n===== PROFILE =====")
+        for name, profile in self.profiles.items():
+            base = os.path.join(PROFILE_DIR, f"{self.run_name}_{name}")
+            profile.dump_stats(f"{base}.prof")
+
+            allocations = self.allocations[name]
+            with open(f"{base}_allocations.txt", 'w', encoding='utf-8') as f:
+                sampled = min(self.entries[name], SAMPLED_ENTRIES)
+                f.write(f"Top allocation sites for stage '{name}' (net bytes, first {sampled} of {self.entries[name]} entries)\n")
+                for site, size in allocations.most_common(TOP_ALLOCATIONS):
+                    f.write(f"{size:>12}  {site}\n")
+
+            print(f"{name:<14} {self.wall_times[name]:8.2f}s  {self.entries[name]:5} entries  "
+                  f"{self.net_memory[name] / 1024:10.1f} KiB net  -> {base}.prof")
+        peak = tracemalloc.get_traced_memory()[1]
+        print(f"Peak traced memory: {peak / (1024 * 1024):.1f} MiB")
+
+profiler = StageProfiler()
@@ -23,4 +23,17 @@ class TasteIOItem(TypedDict):
     year: Union[str, int]
     slug: str
     category: str
-    user: dict
\ No newline at end of file
+    user: dict
+
+class TasteIOEntity(TypedDict):
+    item: TasteIOItem  # Item of the source that decided the status
+    status: str  # Simkl list the title ends up in
+    rating: Optional[float]  # Simkl 10-point rating, if the title was rated
+    sources: List[str]  # Statuses of every source the title appeared in
+
+class PlannedCall(TypedDict):
+    kind: str  # 'ratings', 'list' or 'history'
+    description: str
+    endpoint: str
+    payload: dict
+    items: int
@@ -1,15 +1,33 @@
 import os
+import sys
+import argparse
 import json
 import time
 import random
 import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import requests
+from urllib.parse import urlsplit
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.support.ui import WebDriverWait
 from webdriver_manager.chrome import ChromeDriverManager
-from cache import load_cache, save_cache
-from cache import SimklApiLimitException, EPISODES_CACHE_FILE, CACHE_TIMEOUT_DAYS
+try:
+    import psutil  # Optional, only used to report the browser's memory
+except ImportError:
+    psutil = None
+import cassette
+import export_db
+import work_queue
+from pacing import get_pacer, print_pacing_summary
+from transport import http_request
+from http_cache import conditional_get, get_extra, set_extra, print_http_cache_summary
+from profiling import profiler
+from episodes import EpisodeSet, load_sent_episodes, show_key
+from cache import load_cache, save_cache, add_failed_lookup, get_failed_lookups
+from cache import SimklApiLimitException
 
 from config import (
     USERNAME, BASE_URL, SAVED_URL, CONTINUE_WATCHING_URL, TV_EPISODES_URL,
@@ -17,9 +35,35 @@ from config import (
     MIN_DELAY, MAX_DELAY, HEADLESS_MODE, PAGE_LOAD_TIMEOUT,
     OUTPUT_FILE, JSON_INDENT, COOKIE_DEFAULTS,
     SIMKL_CLIENT_ID, SIMKL_SEARCH_URL, TASTE_TOKEN,
-    SCRAPE_RATINGS, SCRAPE_SAVED, SCRAPE_CONTINUE_WATCHING
+    SCRAPE_RATINGS, SCRAPE_SAVED, SCRAPE_CONTINUE_WATCHING,
+    USE_WORK_QUEUE, WORK_QUEUE_LOCAL_WORKERS, EMIT_NEW_EPISODES_ONLY, ADAPTIVE_PACING,
+    HTTP_CASSETTE_MODE, PROFILE_DIR, BROWSER_BATCH_FETCH, BROWSER_BATCH_SIZE,
+    LEAN_BROWSER, BROWSER_PAGE_LOAD_STRATEGY, BROWSER_BLOCK_RESOURCES,
+    EXPORT_DB, EXPORT_DB_FILE, SCRAPE_CONCURRENTLY, LIVE_HANDOFF
 )
-from schemas import SimklBackup, MediaEntry, TasteIOItem
+from schemas import SimklBackup, MediaEntry, TasteIOItem, TasteIOEntity
+from entities import build_entity_index
+from checkpoint import ScrapeCheckpoint
+from handoff import HandoffWriter
+
+# Chrome switches for the lean profile that turn off subsystems a JSON page load never needs
+LEAN_BROWSER_ARGUMENTS = [
+    "--disable-extensions",
+    "--disable-gpu",
+    "--disable-dev-shm-usage",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--mute-audio",
+    "--no-first-run",
+    "--disable-features=Translate,MediaRouter,OptimizationHints",
+]
+# Requests blocked through the DevTools protocol in the lean profile (images, fonts and stylesheets)
+BLOCKED_RESOURCE_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.css",
+]
 
 # Configuration for Selenium Chrome Driver
 chrome_options = Options()
@@ -37,23 +81,183 @@ for key, value in REQUEST_HEADERS.items():
     chrome_options.add_argument(f"--header={key}: {value}")
 
 # Add default cookies
-chrome_options.add_argument("--start-maximized")
+if not LEAN_BROWSER:
+    chrome_options.add_argument("--start-maximized")
 for key, value in COOKIE_DEFAULTS.items():
     chrome_options.add_argument(f"--cookie={key}={value}")
 
-# Initialize the WebDriver with automatic ChromeDriver management
-service = Service(ChromeDriverManager().install())
-driver = webdriver.Chrome(service=service, options=chrome_options)
-driver.set_page_load_timeout(PAGE_LOAD_TIMEOUT)
+# Lean profile: every page we load is a plain JSON document, so skip rendering work and unused subsystems
+if LEAN_BROWSER:
+    chrome_options.page_load_strategy = BROWSER_PAGE_LOAD_STRATEGY
+    chrome_options.add_argument("--window-size=800,600")
+    for argument in LEAN_BROWSER_ARGUMENTS:
+        chrome_options.add_argument(argument)
+    if BROWSER_BLOCK_RESOURCES:
+        chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+        chrome_options.add_experimental_option("prefs", {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.managed_default_content_settings.stylesheets": 2,
+        })
+
+# Fetches every URL passed in from inside the current page and returns their status and raw body text
+BATCH_FETCH_SCRIPT = """
+const urls = arguments[0];
+const done = arguments[arguments.length - 1];
+Promise.all(urls.map(url =>
+    fetch(url, {credentials: 'include', headers: {'Accept': 'application/json'}})
+        .then(response => response.text().then(body => ({status: response.status, body: body})))
+        .catch(error => ({status: 0, body: String(error)}))
+)).then(done);
+"""
+
+# The WebDriver is started on first use so that work queue workers can import this module without Chrome
+driver = None
+
+# Page-load latencies and browser memory, reported at the end of a run
+browser_stats = {"load_times": [], "rss_start_mb": None}
+
+# Number of Simkl search requests made by this process (used for per-client-ID quota accounting)
+simkl_request_count = 0
+
+# Ratings and saved items are both loaded through the single WebDriver, which must not be shared between threads
+browser_lock = threading.Lock()
+
+# Simkl IDs collected from the work queue, keyed by work_queue.job_key (None when not using the queue)
+queued_resolutions = None
+
+def get_driver():
+    """Initialize the WebDriver with automatic ChromeDriver management on first use."""
+    global driver
+    if driver is None:
+        service = Service(ChromeDriverManager().install())
+        driver = webdriver.Chrome(service=service, options=chrome_options)
+        driver.set_page_load_timeout(PAGE_LOAD_TIMEOUT)
+        driver.set_script_timeout(PAGE_LOAD_TIMEOUT)
+        if LEAN_BROWSER and BROWSER_BLOCK_RESOURCES:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_RESOURCE_PATTERNS})
+        browser_stats["rss_start_mb"] = get_browser_rss_mb()
+    return driver
+
+def close_extra_windows(driver) -> None:
+    """Keep a single reused tab, closing anything a page may have opened.
+
+    Only called after a page that wasn't JSON (an anti-bot or error page), since the API's JSON
+    responses never open windows and checking costs a WebDriver round trip.
+    """
+    handles = driver.window_handles
+    if len(handles) <= 1:
+        return
+    for handle in handles[1:]:
+        driver.switch_to.window(handle)
+        driver.close()
+    driver.switch_to.window(handles[0])
+
+def get_browser_rss_mb() -> float | None:
+    """Return the resident memory of ChromeDriver and every Chrome process it started, if psutil is available."""
+    if psutil is None or driver is None:
+        return None
+    try:
+        process = psutil.Process(driver.service.process.pid)
+        processes = [process] + process.children(recursive=True)
+        return sum(p.memory_info().rss for p in processes if p.is_running()) / (1024 * 1024)
+    except (psutil.Error, AttributeError):
+        return None
+
+def print_browser_summary() -> None:
+    """Print page-load latency and browser memory so lean and standard profiles can be compared."""
+    load_times = sorted(browser_stats["load_times"])
+    if not load_times:
+        return
+    profile = f"lean, {BROWSER_PAGE_LOAD_STRATEGY} page loads" if LEAN_BROWSER else "standard"
+    p95 = load_times[min(len(load_times) - 1, int(len(load_times) * 0.95))]
+    print(f"Browser ({profile}): {len(load_times)} page loads, "
+          f"median {load_times[len(load_times) // 2]:.2f}s, p95 {p95:.2f}s")
+
+    rss_start, rss_end = browser_stats["rss_start_mb"], get_browser_rss_mb()
+    if rss_start is None or rss_end is None:
+        print("Browser memory: install psutil to report the browser's RSS")
+    else:
+        print(f"Browser memory: {rss_start:.0f} MiB RSS at start, {rss_end:.0f} MiB at the end")
 
 def get_json_from_page(url):
     """Loads the given URL with Selenium and returns the parsed JSON from the page body."""
+    if HTTP_CASSETTE_MODE == "replay":
+        return json.loads(cassette.replay_page(url))
+
+    driver = get_driver()
+    pacer = get_pacer(url)
+    pacer.wait()
+    start = time.monotonic()
     driver.get(url)
-    # Add random delay to mimic human behavior
-    time.sleep(random.uniform(MIN_DELAY, MAX_DELAY))
     # The page source is plain JSON text; extract the text from the <body> element
-    body_text = driver.find_element("tag name", "body").text
-    return json.loads(body_text)
+    if LEAN_BROWSER and BROWSER_PAGE_LOAD_STRATEGY == "none":
+        # get() returns right away with the "none" strategy, so wait for the body text to arrive
+        body_text = WebDriverWait(driver, PAGE_LOAD_TIMEOUT).until(
+            lambda d: d.find_element("tag name", "body").text
+        )
+    else:
+        body_text = driver.find_element("tag name", "body").text
+    browser_stats["load_times"].append(time.monotonic() - start)
+    try:
+        data = json.loads(body_text)
+    except ValueError:
+        # Anything but JSON is an anti-bot or error page, back off before the next load
+        pacer.record(time.monotonic() - start, blocked=True)
+        if LEAN_BROWSER:
+            close_extra_windows(driver)
+        raise
+    pacer.record(time.monotonic() - start)
+    if HTTP_CASSETTE_MODE == "record":
+        cassette.record_page(url, body_text)
+
+    if not ADAPTIVE_PACING:
+        # Add random delay to mimic human behavior
+        time.sleep(random.uniform(MIN_DELAY, MAX_DELAY))
+    return data
+
+def get_json_batch(urls: list) -> list:
+    """Fetch several taste.io API URLs in one WebDriver round trip and return their parsed JSON.
+
+    The requests are issued with fetch() from inside the already loaded taste.io page, so they carry
+    the browser's cookies and fingerprint without a navigation and render per page. URLs that don't
+    come back as JSON are loaded again with a regular page navigation.
+    """
+    if HTTP_CASSETTE_MODE == "replay":
+        return [json.loads(cassette.replay_page(url)) for url in urls]
+
+    driver = get_driver()
+    if urlsplit(driver.current_url).netloc != urlsplit(urls[0]).netloc:
+        # Establish an authenticated page context on the API's origin first
+        return [get_json_from_page(urls[0])] + (get_json_batch(urls[1:]) if urls[1:] else [])
+
+    pacer = get_pacer(urls[0])
+    pacer.wait()
+    start = time.monotonic()
+    responses = driver.execute_async_script(BATCH_FETCH_SCRIPT, urls)
+    latency = time.monotonic() - start
+
+    results = []
+    blocked = False
+    for url, response in zip(urls, responses):
+        try:
+            if response["status"] != 200:
+                raise ValueError(f"HTTP {response['status']}")
+            data = json.loads(response["body"])
+        except ValueError as e:
+            print(f"Batched fetch of {url} failed ({e}), loading the page instead...")
+            blocked = True
+            results.append(None)
+            continue
+        if HTTP_CASSETTE_MODE == "record":
+            cassette.record_page(url, response["body"])
+        results.append(data)
+    pacer.record(latency, blocked=blocked)
+
+    if not ADAPTIVE_PACING:
+        # Add random delay to mimic human behavior
+        time.sleep(random.uniform(MIN_DELAY, MAX_DELAY))
+    return [data if data is not None else get_json_from_page(url) for url, data in zip(urls, results)]
 
 def convert_ms_to_iso(ms: int | None) -> str | None:
     """Convert millisecond timestamp to ISO 8601 format."""
@@ -62,9 +266,32 @@ def convert_ms_to_iso(ms: int | None) -> str | None:
     dt = datetime.datetime.fromtimestamp(ms / 1000.0, datetime.UTC)
     return dt.isoformat()
 
-def get_ids(title: str, year: int, category: str) -> int | None:
-    """Fetch Simkl ID from their API using the title title."""
-    if not SIMKL_CLIENT_ID:
+def search_simkl(url: str, params: dict) -> dict | None:
+    """Run a single Simkl search request and return the IDs of the first result, if any."""
+    global simkl_request_count
+    simkl_request_count += 1
+    response = http_request("GET", url, params=params)
+    response.raise_for_status()
+    data = response.json()
+
+    # Check if we got results
+    if data and len(data) > 0:
+        item = data[0]
+        if item.get("ids", {}).get("simkl_id"):
+            return {
+                "simkl": item.get("ids", {}).get("simkl_id"),
+                "tmdb": int(item.get("ids", {}).get("tmdb", 0))
+            }
+    return None
+
+def get_ids(title: str, year: int, category: str, client_id: str | None = None, raise_errors: bool = False) -> int | None:
+    """Fetch Simkl ID from their API using the title title.
+
+    Returns None when Simkl has no match. Failed requests also return None unless raise_errors is
+    set, in which case they are raised so the caller can retry the lookup later.
+    """
+    client_id = client_id or SIMKL_CLIENT_ID
+    if not client_id:
         print("Warning: SIMKL_CLIENT_ID not set. Please configure it in config.py")
         return None
 
@@ -75,22 +302,13 @@ def get_ids(title: str, year: int, category: str) -> int | None:
             "q": query,
             "page": 1,
             "limit": 1,
-            "client_id": SIMKL_CLIENT_ID
+            "client_id": client_id
         }
 
         final_search_url = f"{SIMKL_SEARCH_URL}/{category}"
-        response = requests.get(final_search_url, params=params)
-        response.raise_for_status()
-        data = response.json()
-
-        # Check if we got results
-        if data and len(data) > 0:
-            item = data[0]
-            if item.get("ids", {}).get("simkl_id"):
-                return {
-                    "simkl": item.get("ids", {}).get("simkl_id"),
-                    "tmdb": int(item.get("ids", {}).get("tmdb", 0))
-                }
+        ids = search_simkl(final_search_url, params)
+        if ids:
+            return ids
 
         if year != None:
             # If no results, try without year
@@ -98,67 +316,61 @@ def get_ids(title: str, year: int, category: str) -> int | None:
                 "q": title,
                 "page": 1,
                 "limit": 1,
-                "client_id": SIMKL_CLIENT_ID
+                "client_id": client_id
             }
 
-            response = requests.get(final_search_url, params=params_without_year)
-            response.raise_for_status()
-            data = response.json()
-
-            if data and len(data) > 0:
-                item = data[0]
-                if item.get("ids", {}).get("simkl_id"):
-                    return {
-                        "simkl": item.get("ids", {}).get("simkl_id"),
-                        "tmdb": int(item.get("ids", {}).get("tmdb", 0))
-                    }
+            ids = search_simkl(final_search_url, params_without_year)
+            if ids:
+                return ids
 
         # If still no results and not already anime category, try with anime category
         if category != "anime":
             anime_url = f"{SIMKL_SEARCH_URL}/anime"
 
             # Try with year first
-            response = requests.get(anime_url, params=params)
-            response.raise_for_status()
-            data = response.json()
-
-            if data and len(data) > 0:
-                item = data[0]
-                if item.get("ids", {}).get("simkl_id"):
-                    return {
-                        "simkl": item.get("ids", {}).get("simkl_id"),
-                        "tmdb": int(item.get("ids", {}).get("tmdb", 0))
-                    }
+            ids = search_simkl(anime_url, params)
+            if ids:
+                return ids
 
             if year != None:
                 # Try without year
-                response = requests.get(anime_url, params=params_without_year)
-                response.raise_for_status()
-                data = response.json()
-
-                if data and len(data) > 0:
-                    item = data[0]
-                    if item.get("ids", {}).get("simkl_id"):
-                        return {
-                            "simkl": item.get("ids", {}).get("simkl_id"),
-                            "tmdb": int(item.get("ids", {}).get("tmdb", 0))
-                        }
+                ids = search_simkl(anime_url, params_without_year)
+                if ids:
+                    return ids
 
         print(f"Warning: No matching Simkl ID found for {title} ({year})")
         # Track failed lookup
         add_failed_lookup(title, year, category, "No matching Simkl ID found")
         return None
 
+    except SimklApiLimitException:
+        raise
     except Exception as e:
         print(f"Error fetching Simkl ID for {title}: {e}")
+        if raise_errors:
+            raise
         # Track failed lookup
         add_failed_lookup(title, year, category, str(e))
         return None
 
-def fetch_items_from_api(url, cache_key):
-    """Fetch all items from the given API URL with pagination."""
+def resolve_ids(title: str, year: int, category: str, raise_errors: bool = False) -> dict | None:
+    """Return the Simkl IDs resolved by the work queue when it is in use, otherwise query Simkl directly."""
+    if queued_resolutions is not None:
+        return queued_resolutions.get(work_queue.job_key(title, year, category))
+    return get_ids(title, year, category, raise_errors=raise_errors)
+
+def get_category(item: TasteIOItem) -> str:
+    """Map a taste.io item to the Simkl search category."""
+    if item.get("category") == "movies":
+        return "movie"
+    elif 'anime' in (item.get("genre") or ""):
+        return "anime"
+    return "tv"
+
+def fetch_items_from_api(url, cache_key, use_cache: bool = True):
+    """Fetch all items from the given API URL with pagination (use_cache=False forces a refresh)."""
     # Try to load cached items
-    cached_items = load_cache(cache_key)
+    cached_items = load_cache(cache_key) if use_cache else None
     if cached_items:
         print(f"Using cached {cache_key} items...")
         return cached_items
@@ -181,38 +393,46 @@ def fetch_items_from_api(url, cache_key):
     all_items.extend(data.get("items", []))
     save_cache(all_items, cache_key)
 
-    # Fetch remaining pages
-    offset = API_LIMIT
-    while offset < total_items:
+    # Fetch remaining pages, several per round trip when batched fetching is enabled
+    page_urls = []
+    for offset in range(API_LIMIT, total_items, API_LIMIT):
         page_url = f"{url}?limit={API_LIMIT}&offset={offset}"
         if cache_key == 'saved':
             page_url += "&maxReleaseDate=1744443802477&sort=trending"
-
-        print("Requesting URL:", page_url)
-        page_data = get_json_from_page(page_url)
-        new_items = page_data.get("items", [])
-        all_items.extend(new_items)
-        # Update cache after each page
+        page_urls.append(page_url)
+
+    batch_size = BROWSER_BATCH_SIZE if BROWSER_BATCH_FETCH else 1
+    for i in range(0, len(page_urls), batch_size):
+        batch = page_urls[i:i + batch_size]
+        for page_url in batch:
+            print("Requesting URL:", page_url)
+        pages = get_json_batch(batch) if BROWSER_BATCH_FETCH else [get_json_from_page(batch[0])]
+        for page_data in pages:
+            all_items.extend(page_data.get("items", []))
+        # Update cache after each page (or batch of pages)
         save_cache(all_items, cache_key)
-        offset += API_LIMIT
 
     print(f"Total {cache_key} items collected:", len(all_items))
     return all_items
 
-def fetch_continue_watching_items():
-    """Fetch items from the continue-watching API endpoint."""
+def fetch_continue_watching_items(use_cache: bool = True):
+    """Fetch items from the continue-watching API endpoint (use_cache=False forces a refresh)."""
     if not TASTE_TOKEN:
         print("Warning: TASTE_TOKEN not set. Cannot fetch continue-watching items.")
         return []
 
     # Try to load cached items
-    cached_items = load_cache('watching')
+    cached_items = load_cache('watching') if use_cache else None
     if cached_items:
         print("Using cached continue-watching items...")
         return cached_items
 
+    # An expired copy can still be revalidated page by page with conditional requests
+    stale_items = load_cache('watching', ignore_expiry=True) or []
+
     print("Cache not found or expired for continue-watching, fetching from API...")
     all_items = []
+    changed = False
 
     # Retrieve the first page
     first_page_url = f"{CONTINUE_WATCHING_URL}?limit={API_LIMIT}&offset=0"
@@ -220,46 +440,103 @@ def fetch_continue_watching_items():
 
     # Use authenticated headers
     headers = get_auth_headers()
-    response = requests.get(first_page_url, headers=headers)
-    response.raise_for_status()
-    data = response.json()
-
-    total_items = data.get("total", 0)
+    known_total = get_extra(first_page_url).get("total")
+    have_copy = known_total is not None and len(stale_items) >= min(API_LIMIT, known_total)
+    response = conditional_get(first_page_url, headers, have_copy=have_copy)
+    if response is None:
+        # Unchanged since the last run, keep the page from the cached copy
+        total_items = known_total
+        all_items.extend(stale_items[:API_LIMIT])
+    else:
+        data = response.json()
+        total_items = data.get("total", 0)
+        set_extra(first_page_url, total=total_items)
+        all_items.extend(data.get("items", []))
+        changed = True
+        # Process first page items and save to cache immediately
+        save_cache(all_items, 'watching')
     print(f"Total continue-watching items found: {total_items}")
 
-    # Process first page items and save to cache immediately
-    all_items.extend(data.get("items", []))
-    save_cache(all_items, 'watching')
-
     # Fetch remaining pages
     offset = API_LIMIT
     while offset < total_items:
         page_url = f"{CONTINUE_WATCHING_URL}?limit={API_LIMIT}&offset={offset}"
         print("Requesting URL:", page_url)
-        page_response = requests.get(page_url, headers=headers)
-        page_response.raise_for_status()
-        page_data = page_response.json()
-        new_items = page_data.get("items", [])
-        all_items.extend(new_items)
+        have_copy = len(stale_items) >= min(offset + API_LIMIT, total_items)
+        page_response = conditional_get(page_url, headers, have_copy=have_copy)
+        if page_response is None:
+            all_items.extend(stale_items[offset:offset + API_LIMIT])
+        else:
+            page_data = page_response.json()
+            new_items = page_data.get("items", [])
+            all_items.extend(new_items)
+            changed = True
         # Update cache after each page
-        save_cache(all_items, 'watching')
+        if changed:
+            save_cache(all_items, 'watching')
         offset += API_LIMIT
 
+    if not changed:
+        print("Continue-watching items unchanged since the last fetch")
     print(f"Total continue-watching items collected: {len(all_items)}")
     return all_items
 
-def fetch_watched_episodes(slug):
-    """Fetch watched episodes for a TV show."""
+def fetch_source(source: str) -> list:
+    """Fetch the items of one taste.io source, holding the browser lock for the Selenium-based ones."""
+    start = time.monotonic()
+    if source == 'watching':
+        # Continue-watching uses plain HTTP and can run alongside the browser
+        items = fetch_continue_watching_items()
+    else:
+        with browser_lock:
+            items = fetch_items_from_api(BASE_URL if source == 'ratings' else SAVED_URL, source)
+    print(f"[{source}] {len(items)} items in {time.monotonic() - start:.1f}s")
+    return items
+
+def fetch_sources(sources: list) -> tuple:
+    """Fetch the given sources concurrently (if SCRAPE_CONCURRENTLY) and return their items keyed by source,
+    plus the sources that failed. A failing source is reported and left empty so the others still complete.
+
+    With --profile the sources are fetched one after another in the calling thread, since cProfile
+    only sees the thread it was enabled in.
+    """
+    results = {}
+    failed = []
+    if not SCRAPE_CONCURRENTLY or profiler.enabled:
+        for source in sources:
+            try:
+                results[source] = fetch_source(source)
+            except Exception as e:
+                print(f"[{source}] Scraping failed: {e}")
+                results[source] = []
+                failed.append(source)
+        return results, failed
+
+    with ThreadPoolExecutor(max_workers=max(len(sources), 1), thread_name_prefix="source") as executor:
+        futures = {executor.submit(fetch_source, source): source for source in sources}
+        for future in as_completed(futures):
+            source = futures[future]
+            try:
+                results[source] = future.result()
+            except Exception as e:
+                print(f"[{source}] Scraping failed: {e}")
+                results[source] = []
+                failed.append(source)
+    return results, failed
+
+def fetch_watched_episodes(slug, use_cache: bool = True) -> EpisodeSet:
+    """Fetch watched episodes for a TV show (use_cache=False forces a refresh)."""
     if not TASTE_TOKEN:
         print("Warning: TASTE_TOKEN not set. Cannot fetch episode data.")
-        return []
+        return EpisodeSet()
 
-    # Try to load cached items
+    # Use the cached episodes while they are fresh, an expired copy is revalidated below
     cache_key = f"episodes_{slug}"
-    cached_items = load_cache(cache_key)
-    if cached_items:
+    fresh_items = load_cache(cache_key) if use_cache else None
+    if fresh_items is not None:
         print(f"Using cached episode data for {slug}...")
-        return cached_items
+        return EpisodeSet.load(fresh_items)
+    cached_items = load_cache(cache_key, ignore_expiry=True)
 
     print(f"Fetching episode data for {slug}...")
 
@@ -268,248 +545,251 @@ def fetch_watched_episodes(slug):
     url = TV_EPISODES_URL.format(slug=slug)
 
     try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
+        # Revalidate the cached copy if there is one, an unchanged response needs no parsing or saving
+        response = conditional_get(url, headers, have_copy=cached_items is not None)
+        if response is None:
+            print(f"Episode data for {slug} unchanged")
+            cached_episodes = EpisodeSet.load(cached_items)
+            # Restart the show's expiry so it is only revalidated again once it expires
+            save_cache(cached_episodes.to_ranges(), cache_key)
+            return cached_episodes
         data = response.json()
 
         # Extract watched episodes (where user.tracked is true)
-        watched_episodes = []
-        for item in data.get("items", []):
+        watched_episodes = EpisodeSet.from_episodes(
+            item for item in data.get("items", [])
             # Skip episodes in season 0 (specials) as they're buggy
-            if item.get("season") == 0:
-                continue
-
-            if item.get("user", {}).get("tracked", False):
-                watched_episodes.append({
-                    "season": item.get("season"),
-                    "episode": item.get("episode")
-                })
+            if item.get("season") != 0 and item.get("user", {}).get("tracked", False)
+        )
 
-        # Save to consolidated episodes cache
-        save_cache(watched_episodes, cache_key)
+        # Save to consolidated episodes cache in run-length form
+        save_cache(watched_episodes.to_ranges(), cache_key)
         return watched_episodes
 
-    except Exception as e:
+    except (requests.exceptions.RequestException, ValueError) as e:
         print(f"Error fetching episode data for {slug}: {e}")
-        return []
+        return EpisodeSet()
 
-def process_item(item: TasteIOItem) -> MediaEntry:
-    """Process a single item from taste.io and convert it to Simkl format."""
-    # Determine the rating value (convert from 4-star to 10-point scale)
-    star_rating = item.get("highlightRating") or item.get("user", {}).get("rating")
-    rating_value = star_rating * 2.5
+def process_entity(entity: TasteIOEntity, raise_errors: bool = False) -> MediaEntry | None:
+    """Resolve a merged taste.io title once and convert it to Simkl format with its final status.
+    With raise_errors, a failed Simkl lookup raises instead of counting as "no match" (see get_ids)."""
+    item = entity["item"]
 
     # Get the Simkl ID from their API
-    if item.get("category") == "movies":
-        category = "movie"
-    elif 'anime' in item.get("genre"):
-        category = "anime"
-    else:
-        category = "tv"
-    ids = get_ids(item.get("name", ""), item.get("year", ""), category)
+    ids = resolve_ids(item.get("name", ""), item.get("year", ""), get_category(item), raise_errors=raise_errors)
 
-    return MediaEntry(
-        title=item.get("name", ""),
-        rating=rating_value,
-        year=item.get("year", ""),
-        to='completed',
-        ids=ids
-    )
-
-def process_saved_item(item: TasteIOItem) -> MediaEntry:
-    """Process a single saved item from taste.io and convert it to Simkl format with 'plantowatch' status."""
-    # Get the Simkl ID from their API
-    if item.get("category") == "movies":
-        category = "movie"
-    elif 'anime' in item.get("genre", ""):
-        category = "anime"
-    else:
-        category = "tv"
-    ids = get_ids(item.get("name", ""), item.get("year", ""), category)
-
-    # Skip items where we couldn't find a Simkl ID
-    if not ids:
+    # Skip unrated items where we couldn't find a Simkl ID
+    if not ids and entity["status"] != 'completed':
         return None
 
     return MediaEntry(
         title=item.get("name", ""),
-        rating=None,  # No rating for saved items
+        rating=entity["rating"],  # Only rated titles have a rating
         year=item.get("year", ""),
-        to='plantowatch',  # Set status to plantowatch
+        to=entity["status"],
         ids=ids
     )
 
-def process_watching_item(item: TasteIOItem) -> MediaEntry:
-    """Process a single item from continue-watching and convert it to Simkl format."""
-    # Get the Simkl ID from their API
-    if item.get("category") == "movies":
-        category = "movie"
-    elif 'anime' in item.get("genre", ""):
-        category = "anime"
-    else:
-        category = "tv"
-    ids = get_ids(item.get("name", ""), item.get("year", ""), category)
+def is_movie_entity(entity: TasteIOEntity) -> bool:
+    """Ratings default to movies for unknown categories, the other sources to shows."""
+    if entity["status"] == 'completed':
+        return entity["item"].get("category") != "tv"
+    return entity["item"].get("category") == "movies"
+
+def resolve_with_work_queue(entities: list) -> None:
+    """Enqueue a Simkl lookup for every entity, let the workers resolve them and collect the results."""
+    global queued_resolutions
+    jobs = [
+        (entity["item"].get("name", ""), entity["item"].get("year", ""), get_category(entity["item"]))
+        for entity in entities
+    ]
+
+    conn = work_queue.connect()
+    try:
+        added = work_queue.enqueue_jobs(conn, jobs)
+        print(f"Enqueued {added} new Simkl lookups ({len(set(jobs))} distinct titles in this run)")
 
-    # Skip items where we couldn't find a Simkl ID
-    if not ids:
-        return None
+        workers = work_queue.start_local_workers(WORK_QUEUE_LOCAL_WORKERS)
+        try:
+            if not work_queue.wait_for_jobs(conn, workers):
+                print("Not every lookup could be resolved in this run, the rest stays queued for the next one.")
+        finally:
+            for worker in workers:
+                worker.wait()
 
-    return MediaEntry(
-        title=item.get("name", ""),
-        rating=None,  # No rating for watching items
-        year=item.get("year", ""),
-        to='watching',  # Set status to watching
-        ids=ids
-    )
+        queued_resolutions = work_queue.collect_results(conn)
+    finally:
+        conn.close()
 
-def extract_watched_episodes() -> list:
-    """Load watched episodes from cache if valid."""
-    episodes_cache = {}
-    cache_valid = False
-    if os.path.exists(EPISODES_CACHE_FILE):
-        with open(EPISODES_CACHE_FILE, 'r', encoding='utf-8') as f:
-            try:
-                episodes_cache = json.load(f)
-                cache_timestamp = episodes_cache.get('timestamp', 0)
-                if time.time() - cache_timestamp <= (CACHE_TIMEOUT_DAYS * 24 * 60 * 60):
-                    cache_valid = True
-            except Exception:
-                episodes_cache = {'timestamp': 0, 'items': {}}
-    else:
-        episodes_cache = {'timestamp': 0, 'items': {}}
-    if cache_valid:
-        # Return all processed episodes from cache
-        return list(episodes_cache.get('items', {}).values())
-    return []
+def parse_args(argv: list | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Scrape taste.io into a Simkl backup")
+    parser.add_argument("--restart", action="store_true",
+                        help="Forget the progress of an interrupted run and process every title again")
+    parser.add_argument("--profile", action="store_true",
+                        help=f"Profile each stage with cProfile and tracemalloc and write the results to {PROFILE_DIR}/")
+    return parser.parse_args(argv)
+
+def main(argv: list | None = None):
+    args = parse_args(argv)
+    if args.profile:
+        profiler.start("scraper")
 
-def main():
     # Initialize the backup structure
     backup = SimklBackup(movies=[], shows=[])
     # Dictionary to store watched episodes data for the importer
     watched_episodes = {}
-    # Track items that failed to get Simkl IDs
-    failed_items = []
+    all_episodes_processed = True
+    watching_items = []
+
+    checkpoint = ScrapeCheckpoint()
+    if args.restart:
+        checkpoint.clear()
+    # Live feed for importer.py --follow
+    feed = HandoffWriter() if LIVE_HANDOFF else None
 
     try:
-        ratings_cache = set()  # Keep track of rated items to filter out duplicates
         try:
-            # Fetch rated items if enabled
+            # Collect the enabled sources
+            sources = []
             if SCRAPE_RATINGS:
                 print("Scraping ratings...")
-                ratings_items = fetch_items_from_api(BASE_URL, 'ratings')
-
-                # Process rated items
-                for item in ratings_items:
-                    entry = process_item(item)
-                    # Add to ratings cache for filtering saved items later
-                    if entry and entry.get("ids") and entry.get("ids").get("simkl"):
-                        ratings_cache.add(entry.get("ids").get("simkl"))
-
-                    if item.get("category") == "tv":
-                        backup["shows"].append(entry)
-                    else:  # Default to movies for unknown categories
-                        backup["movies"].append(entry)
+                sources.append('ratings')
             else:
                 print("Skipping ratings scraping (disabled in config)")
 
-            # Fetch saved items if enabled
             if SCRAPE_SAVED:
                 print("Scraping saved items...")
-                saved_items = fetch_items_from_api(SAVED_URL, 'saved')
-
-                # Process saved items (filter out duplicates)
-                for item in saved_items:
-                    # Skip items that are already rated
-                    item_key = f"{item.get('name')}_{item.get('year')}"
-                    if item_key in ratings_cache:
-                        continue
-
-                    # Process the saved item
-                    entry = process_saved_item(item)
-                    if entry:
-                        if item.get("category") == "movies":
-                            backup["movies"].append(entry)
-                        else:
-                            backup["shows"].append(entry)
+                sources.append('saved')
             else:
                 print("Skipping saved items scraping (disabled in config)")
 
-            # Fetch continue-watching items if enabled and TASTE_TOKEN is available
+            # Continue-watching items need TASTE_TOKEN
             if SCRAPE_CONTINUE_WATCHING and TASTE_TOKEN:
                 print("Scraping continue-watching items...")
-                watching_items = fetch_continue_watching_items()
-
-                # Load all cached episodes (if any)
-                episodes_cache = extract_watched_episodes()
-                all_episodes_processed = True
-                watched_episodes = {}
-
-                for item in watching_items:
-                    # Process the watching item
-                    entry = process_watching_item(item)
-                    if entry:
-                        if item.get("category") == "movies":
-                            backup["movies"].append(entry)
-                        else:
-                            # For TV shows, fetch watched episodes
-                            slug = item.get("slug")
-                            if slug:
-                                cache_key = f"episodes_{slug}"
-                                cached_eps = load_cache(cache_key)
-                                # If cache is valid and episodes exist, skip processing
-                                if cache_valid and episodes_cache.get('items', {}).get(slug):
-                                    show_episodes = episodes_cache['items'][slug]
-                                else:
-                                    show_episodes = fetch_watched_episodes(slug)
-                                    if show_episodes:
-                                        save_cache(show_episodes, cache_key)
-                                    else:
-                                        all_episodes_processed = False
-                                        continue
-                                if show_episodes:
-                                    # Group episodes by season
-                                    seasons = {}
-                                    for ep in show_episodes:
-                                        season_num = ep["season"]
-                                        if season_num not in seasons:
-                                            seasons[season_num] = []
-                                        seasons[season_num].append({"number": ep["episode"]})
-
-                                    # Store watched episodes for this show
-                                    watched_episodes[item.get('name', '') + '_' + str(item.get('year', ''))] = {
-                                        "title": item.get("name", ""),
-                                        "year": item.get("year", ""),
-                                        "ids": entry.get("ids", {}),
-                                        "seasons": [
-                                            {"number": season, "episodes": episodes}
-                                            for season, episodes in seasons.items()
-                                        ]
-                                    }
-
-                            backup["shows"].append(entry)
-                elif not SCRAPE_CONTINUE_WATCHING:
-                    print("Skipping continue-watching scraping (disabled in config)")
-                elif not TASTE_TOKEN:
-                    print("Skipping continue-watching scraping (TASTE_TOKEN not set)")
-            except SimklApiLimitException as api_limit_exc:
-                print(str(api_limit_exc))
-                print("API limit reached, skipping the rest of the scraping steps.")
+                sources.append('watching')
+            elif not SCRAPE_CONTINUE_WATCHING:
+                print("Skipping continue-watching scraping (disabled in config)")
+            elif not TASTE_TOKEN:
+                print("Skipping continue-watching scraping (TASTE_TOKEN not set)")
+
+            # Fetch them (concurrently if enabled); the results are merged in the fixed source order below
+            with profiler.stage("pagination"):
+                source_items, failed_sources = fetch_sources(sources)
+            ratings_items = source_items.get('ratings', [])
+            saved_items = source_items.get('saved', [])
+            watching_items = source_items.get('watching', [])
+            if failed_sources:
+                # A backup without a whole source would drop its titles, keep the previous one instead
+                print(f"Could not fetch {', '.join(failed_sources)}, keeping the previous {OUTPUT_FILE}.")
+                print("Run the scraper again to retry.")
+                sys.exit(1)
+
+            # Merge the sources so every distinct title is resolved and emitted exactly once
+            entities = list(build_entity_index(ratings_items, saved_items, watching_items).values())
+            print(f"Found {len(entities)} distinct titles across all sources")
+
+            # Resolve all Simkl IDs up front through the work queue if enabled
+            if USE_WORK_QUEUE:
+                print("Resolving Simkl IDs through the work queue...")
+                with profiler.stage("resolution"):
+                    resolve_with_work_queue(entities)
+
+            sent_episodes = load_sent_episodes() if EMIT_NEW_EPISODES_ONLY else {}
+            # Titles whose lookup failed (not "no match") are left out of the checkpoint and retried next run
+            failed_resolutions = 0
+            for entity in entities:
+                item = entity["item"]
+                # Titles resolved by an interrupted earlier run are taken from the checkpoint
+                record = checkpoint.get(entity)
+                if record is None:
+                    try:
+                        with profiler.stage("resolution"):
+                            entry = process_entity(entity, raise_errors=True)
+                    except (requests.exceptions.RequestException, ValueError):
+                        failed_resolutions += 1
+                        continue
+                    record = checkpoint.record_resolution(entity, entry)
+                entry = record["entry"]
+                if not entry:
+                    continue
+
+                section = "movies" if is_movie_entity(entity) else "shows"
+                backup[section].append(entry)
+                if feed:
+                    feed.publish_entry(section, entry)
+                if section == "movies":
+                    continue
+
+                # For TV shows in continue-watching, fetch watched episodes
+                slug = item.get("slug")
+                if 'watching' in entity["sources"] and slug:
+                    show = {"title": item.get("name", ""), "year": item.get("year", ""), "ids": entry.get("ids", {})}
+                    show_episodes = checkpoint.get_episodes(entity)
+                    if show_episodes is None:
+                        with profiler.stage("episodes"):
+                            show_episodes = fetch_watched_episodes(slug)
+                        if not show_episodes:
+                            all_episodes_processed = False
+                            continue
+                        checkpoint.record_episodes(entity, show_episodes)
+
+                    # Only emit episodes Simkl hasn't accepted yet (also for checkpointed shows, some of
+                    # whose episodes the importer may have sent since the interrupted run)
+                    if EMIT_NEW_EPISODES_ONLY:
+                        show_episodes = show_episodes - sent_episodes.get(show_key(show), EpisodeSet())
+
+                    # Store watched episodes for this show
+                    if show_episodes:
+                        show["seasons"] = show_episodes.to_history()
+                        watched_episodes[item.get('name', '') + '_' + str(item.get('year', ''))] = show
+                        if feed:
+                            feed.publish_episodes(show)
+
+            if failed_resolutions:
+                print(f"{failed_resolutions} Simkl lookups failed, run the scraper again to retry them.")
                 all_episodes_processed = False
-
-        # Save the backup to a file
-        with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-            json.dump(backup, f, ensure_ascii=False, indent=JSON_INDENT)
-
-        # Save watched episodes to a separate file for the importer only if all processed
-        if watched_episodes and all_episodes_processed:
-            with open("watched_episodes.json", 'w', encoding='utf-8') as f:
-                json.dump(list(watched_episodes.values()), f, ensure_ascii=False, indent=JSON_INDENT)
+            else:
+                # Every title went through, the next run starts from scratch
+                checkpoint.clear()
+            if feed:
+                feed.close(complete=not failed_resolutions)
+        except SimklApiLimitException as api_limit_exc:
+            print(str(api_limit_exc))
+            print("API limit reached, skipping the rest of the scraping steps.")
+            print("Run the scraper again once the limit has reset to continue with the remaining titles.")
+            all_episodes_processed = False
+
+        with profiler.stage("serialization"):
+            # Save the backup to a file
+            with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
+                json.dump(backup, f, ensure_ascii=False, indent=JSON_INDENT)
+
+            # Save watched episodes to a separate file for the importer only if all processed
+            # (also when nothing is new, so the importer doesn't resend a previous run's file)
+            if watching_items and all_episodes_processed:
+                with open("watched_episodes.json", 'w', encoding='utf-8') as f:
+                    json.dump(list(watched_episodes.values()), f, ensure_ascii=False, indent=JSON_INDENT)
+
+            # Write the indexed SQLite export alongside the JSON files if enabled
+            if EXPORT_DB:
+                conn = export_db.connect()
+                try:
+                    episodes_complete = watching_items and all_episodes_processed
+                    export_db.write_export(conn, backup, list(watched_episodes.values()) if episodes_complete else None)
+                finally:
+                    conn.close()
 
         print(f"Backup saved to {OUTPUT_FILE}")
         print(f"Total movies: {len(backup['movies'])}")
         print(f"Total shows: {len(backup['shows'])}")
+        print_pacing_summary()
+        print_http_cache_summary()
+        if EXPORT_DB:
+            print(f"SQLite export saved to {EXPORT_DB_FILE}")
         if watched_episodes:
             print(f"Watched episodes data saved to watched_episodes.json")
+        elif watching_items and all_episodes_processed:
+            print("No newly watched episodes since the last import")
 
         # Display failed lookups if any
         failed_lookups = get_failed_lookups()
@@ -523,8 +803,14 @@ def main():
     except Exception as e:
         print(f"An error occurred: {e}")
     finally:
-        # Close the WebDriver
-        driver.quit()
+        checkpoint.save()
+        if feed:
+            feed.close(complete=False)
+        # Close the WebDriver if it was started
+        if driver is not None:
+            print_browser_summary()
+            driver.quit()
+        profiler.report()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
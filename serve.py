@@ -0,0 +1,199 @@
+"""Local read-only HTTP API over the resolved library and the taste.io -> Simkl ID mappings.
+
+The backup written by scraper.py (or daemon.py) and the cached taste.io items are loaded into
+in-memory indexes keyed by taste.io slug, Simkl ID and normalized title, and reloaded in the
+background whenever the scraper writes new data.
+
+Usage:
+    python serve.py [--host HOST] [--port PORT]
+
+Endpoints (all GET, JSON responses):
+    /slug/<slug>               entry for a taste.io slug
+    /simkl/<id>                entry for a Simkl ID
+    /title/<title>?year=YEAR   entries whose normalized title matches
+    /library?status=&section=  every entry, optionally filtered by Simkl list and movies/shows
+    /health                    entry counts and when the data was loaded
+"""
+import argparse
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, unquote
+
+from cache import get_cache_file
+from config import OUTPUT_FILE, SERVE_HOST, SERVE_PORT, SERVE_RELOAD_SECONDS
+
+# Caches holding the taste.io items of each source, used for the slug mappings
+SOURCE_CACHE_KEYS = ('ratings', 'saved', 'watching')
+
+def normalize_title(title: str) -> str:
+    """Lowercase, strip accents and punctuation so "Amélie" and "amelie!" match."""
+    title = unicodedata.normalize("NFKD", str(title or "")).encode("ascii", "ignore").decode("ascii")
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", title.lower()).split())
+
+def item_section(item: dict, cache_key: str) -> str:
+    """Backup section of a cached taste.io item, following scraper.is_movie_entity: ratings default
+    to movies for unknown categories, the other sources to shows."""
+    if cache_key == 'ratings':
+        return "shows" if item.get("category") == "tv" else "movies"
+    return "movies" if item.get("category") == "movies" else "shows"
+
+def _load_json(path: str):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+class Library:
+    """Immutable set of indexes built from one version of the scraper's output."""
+
+    def __init__(self, backup: dict, source_items: list):
+        """source_items holds (cache key, taste.io item) pairs."""
+        self.loaded_at = time.time()
+        self.entries = []
+        self.by_simkl = {}
+        self.by_title = {}
+        self.by_slug = {}
+        by_title_year = {}
+
+        for section in ('movies', 'shows'):
+            for entry in backup.get(section, []):
+                entry = {**entry, "section": section}
+                self.entries.append(entry)
+                simkl_id = (entry.get("ids") or {}).get("simkl")
+                if simkl_id:
+                    self.by_simkl[str(simkl_id)] = entry
+                title = normalize_title(entry.get("title"))
+                self.by_title.setdefault(title, []).append(entry)
+                by_title_year.setdefault((section, title, str(entry.get("year", ""))), entry)
+
+        # The backup has no slugs, so map the cached taste.io items onto entries by section, title and year
+        for cache_key, item in source_items:
+            slug = item.get("slug")
+            entry = by_title_year.get(
+                (item_section(item, cache_key), normalize_title(item.get("name")), str(item.get("year", "")))
+            )
+            if slug and entry and slug not in self.by_slug:
+                self.by_slug[slug] = {"slug": slug, "category": item.get("category"), **entry}
+
+    @classmethod
+    def load(cls) -> "Library":
+        """Build the indexes from the files currently on disk."""
+        backup = _load_json(OUTPUT_FILE) if os.path.exists(OUTPUT_FILE) else {}
+        source_items = []
+        for cache_key in SOURCE_CACHE_KEYS:
+            path = get_cache_file(cache_key)
+            # Expired caches still hold valid mappings, so they are read directly rather than with load_cache
+            if os.path.exists(path):
+                source_items.extend((cache_key, item) for item in _load_json(path).get('items', []))
+        return cls(backup, source_items)
+
+def watched_files() -> list:
+    return [OUTPUT_FILE] + [get_cache_file(cache_key) for cache_key in SOURCE_CACHE_KEYS]
+
+def _mtimes() -> tuple:
+    return tuple(os.path.getmtime(path) if os.path.exists(path) else None for path in watched_files())
+
+class LibraryReloader(threading.Thread):
+    """Polls the scraper's output files and swaps in a new Library when any of them changes."""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.mtimes = _mtimes()
+        self.library = Library.load()
+
+    def run(self) -> None:
+        while True:
+            time.sleep(SERVE_RELOAD_SECONDS)
+            try:
+                mtimes = _mtimes()
+                if mtimes == self.mtimes:
+                    continue
+                library = Library.load()
+            except Exception as e:
+                # The scraper is probably still writing or replacing a file, keep the current
+                # library and try again on the next poll
+                print(f"Could not reload the library yet: {e}")
+                continue
+            # Readers keep using the old indexes until this single reference swap
+            self.library = library
+            self.mtimes = mtimes
+            print(f"Reloaded the library: {len(library.entries)} entries, {len(library.by_slug)} slugs")
+
+class ApiHandler(BaseHTTPRequestHandler):
+    reloader = None
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        parts = [unquote(part) for part in url.path.strip("/").split("/", 1)]
+        library = self.reloader.library
+
+        if parts[0] == "health":
+            self.send_json(200, {
+                "entries": len(library.entries),
+                "slugs": len(library.by_slug),
+                "loaded_at": library.loaded_at,
+            })
+        elif parts[0] == "library":
+            entries = [
+                entry for entry in library.entries
+                if query.get("status") in (None, entry.get("to"))
+                and query.get("section") in (None, entry["section"])
+            ]
+            self.send_json(200, entries)
+        elif len(parts) == 2 and parts[0] == "slug":
+            self.send_found(library.by_slug.get(parts[1]))
+        elif len(parts) == 2 and parts[0] == "simkl":
+            self.send_found(library.by_simkl.get(parts[1]))
+        elif len(parts) == 2 and parts[0] == "title":
+            entries = library.by_title.get(normalize_title(parts[1]), [])
+            if "year" in query:
+                entries = [entry for entry in entries if str(entry.get("year", "")) == query["year"]]
+            self.send_found(entries or None)
+        else:
+            self.send_json(404, {"error": "Unknown endpoint"})
+
+    def send_found(self, result) -> None:
+        if result is None:
+            self.send_json(404, {"error": "Not found"})
+        else:
+            self.send_json(200, result)
+
+    def send_json(self, status: int, data) -> None:
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Lookups are meant to be cheap, don't print a line for every one of them
+        pass
+
+def main(argv: list | None = None):
+    parser = argparse.ArgumentParser(description="Serve the resolved library and Simkl ID mappings over HTTP")
+    parser.add_argument("--host", default=SERVE_HOST)
+    parser.add_argument("--port", type=int, default=SERVE_PORT)
+    args = parser.parse_args(argv)
+
+    reloader = LibraryReloader()
+    reloader.start()
+    ApiHandler.reloader = reloader
+    library = reloader.library
+    print(f"Loaded {len(library.entries)} entries and {len(library.by_slug)} slugs")
+
+    server = ThreadingHTTPServer((args.host, args.port), ApiHandler)
+    print(f"Serving on http://{args.host}:{args.port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
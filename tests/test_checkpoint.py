@@ -0,0 +1,51 @@
+from checkpoint import ScrapeCheckpoint
+from episodes import EpisodeSet
+
+def entity(slug="dark", status="watching", rating=None, sources=("watching",)):
+    item = {"name": "Dark", "year": 2017, "slug": slug, "category": "tv"}
+    return {"item": item, "status": status, "rating": rating, "sources": list(sources)}
+
+ENTRY = {"title": "Dark", "year": 2017, "to": "watching", "ids": {"simkl": 42}}
+
+def test_resolution_is_resumed_after_a_restart(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    checkpoint = ScrapeCheckpoint(path)
+    checkpoint.record_resolution(entity(), ENTRY)
+    checkpoint.record_resolution(entity(slug="missing"), None)
+    checkpoint.save()
+
+    resumed = ScrapeCheckpoint(path)
+    assert resumed.get(entity())["entry"] == ENTRY
+    # A title Simkl had no match for is not looked up again either
+    assert resumed.get(entity(slug="missing"))["entry"] is None
+    assert resumed.get(entity(slug="other")) is None
+
+def test_changed_status_or_rating_is_resolved_again(tmp_path):
+    checkpoint = ScrapeCheckpoint(str(tmp_path / "checkpoint.json"))
+    checkpoint.record_resolution(entity(), ENTRY)
+    assert checkpoint.get(entity(status="completed", rating=8.0, sources=("completed", "watching"))) is None
+    assert checkpoint.get(entity(rating=7.5)) is None
+
+def test_episodes_are_recorded_with_the_resolution(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    checkpoint = ScrapeCheckpoint(path)
+    checkpoint.record_resolution(entity(), ENTRY)
+    assert checkpoint.get_episodes(entity()) is None
+
+    episodes = EpisodeSet.from_ranges({"1": [[1, 8]], "2": [[1, 3]]})
+    checkpoint.record_episodes(entity(), episodes)
+    checkpoint.save()
+    assert ScrapeCheckpoint(path).get_episodes(entity()) == episodes
+
+def test_saves_every_few_changes_and_clear_removes_the_file(tmp_path, monkeypatch):
+    monkeypatch.setattr("checkpoint.SAVE_EVERY", 2)
+    path = tmp_path / "checkpoint.json"
+    checkpoint = ScrapeCheckpoint(str(path))
+    checkpoint.record_resolution(entity(slug="a"), ENTRY)
+    assert not path.exists()
+    checkpoint.record_resolution(entity(slug="b"), ENTRY)
+    assert path.exists()
+
+    checkpoint.clear()
+    assert not path.exists()
+    assert ScrapeCheckpoint(str(path)).items == {}
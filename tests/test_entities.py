@@ -0,0 +1,50 @@
+from entities import build_entity_index, entity_key
+
+def item(slug, category="tv", rating=None, name=None):
+    item = {"name": name or slug.title(), "year": 2020, "slug": slug, "category": category}
+    if rating is not None:
+        item["user"] = {"rating": rating}
+    return item
+
+def test_sources_are_merged_by_category_and_slug():
+    index = build_entity_index(
+        [item("dark", rating=4), item("dune", category="movies", rating=3)],
+        [item("dark"), item("dune", category="tv")],
+        [item("dark")],
+    )
+    # The movie and the show share a slug but are different titles
+    assert list(index) == [("tv", "dark"), ("movies", "dune"), ("tv", "dune")]
+    assert index[("tv", "dark")]["sources"] == ["completed", "plantowatch", "watching"]
+
+def test_items_without_slug_fall_back_to_name_and_year():
+    nameless = {"name": "Dark", "year": 2017, "category": "tv"}
+    assert entity_key(nameless) == ("tv", "Dark_2017")
+    assert len(build_entity_index([nameless], [dict(nameless)], [])) == 1
+
+def test_watching_beats_completed_beats_plantowatch():
+    index = build_entity_index(
+        [item("rated-and-saved", rating=3), item("rated-and-watching", rating=4)],
+        [item("rated-and-saved"), item("saved-only")],
+        [item("rated-and-watching"), item("watching-only")],
+    )
+    assert index[("tv", "rated-and-saved")]["status"] == "completed"
+    assert index[("tv", "saved-only")]["status"] == "plantowatch"
+    assert index[("tv", "rated-and-watching")]["status"] == "watching"
+    assert index[("tv", "watching-only")]["status"] == "watching"
+
+def test_status_item_comes_from_the_winning_source():
+    watching = item("dark", name="Dark (watching)")
+    index = build_entity_index([item("dark", rating=4)], [], [watching])
+    assert index[("tv", "dark")]["item"] is watching
+
+def test_rating_is_kept_when_a_rated_show_is_still_being_watched():
+    index = build_entity_index([item("dark", rating=3)], [item("dark")], [item("dark")])
+    entity = index[("tv", "dark")]
+    assert entity["status"] == "watching"
+    # taste.io's 4-star rating on Simkl's 10-point scale
+    assert entity["rating"] == 7.5
+
+def test_unrated_titles_have_no_rating():
+    index = build_entity_index([], [item("dune")], [item("dark")])
+    assert index[("tv", "dune")]["rating"] is None
+    assert index[("tv", "dark")]["rating"] is None
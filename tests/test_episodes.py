@@ -0,0 +1,40 @@
+from episodes import EpisodeSet, show_key
+
+HISTORY = [
+    {"number": 1, "episodes": [{"number": 1}, {"number": 2}, {"number": 3}, {"number": 5}]},
+    {"number": 2, "episodes": [{"number": 1}]},
+]
+
+def test_history_round_trip():
+    assert EpisodeSet.from_history(HISTORY).to_history() == HISTORY
+
+def test_ranges_round_trip():
+    episodes = EpisodeSet.from_history(HISTORY)
+    assert episodes.to_ranges() == {"1": [[1, 3], [5, 5]], "2": [[1, 1]]}
+    assert EpisodeSet.from_ranges(episodes.to_ranges()) == episodes
+
+def test_load_accepts_legacy_list_and_ranges():
+    legacy = [{"season": 1, "episode": 1}, {"season": 1, "episode": 2}, {"season": "x", "episode": 3}]
+    assert EpisodeSet.load(legacy) == EpisodeSet.from_ranges({"1": [[1, 2]]})
+    assert EpisodeSet.load({"1": [[1, 2]]}) == EpisodeSet.from_ranges({"1": [[1, 2]]})
+    assert not EpisodeSet.load(None)
+
+def test_new_episodes_are_the_difference_with_the_sent_ones():
+    sent = EpisodeSet.from_ranges({"1": [[1, 3]]})
+    watched = EpisodeSet.from_ranges({"1": [[1, 5]], "2": [[1, 2]]})
+    new = watched - sent
+    assert new.to_ranges() == {"1": [[4, 5]], "2": [[1, 2]]}
+    assert len(new) == 4
+
+def test_nothing_new_is_empty():
+    episodes = EpisodeSet.from_history(HISTORY)
+    assert not episodes - episodes
+    assert (episodes - episodes).to_history() == []
+
+def test_union_merges_seasons():
+    merged = EpisodeSet.from_ranges({"1": [[1, 2]]}) | EpisodeSet.from_ranges({"1": [[4, 4]], "3": [[1, 1]]})
+    assert merged.to_ranges() == {"1": [[1, 2], [4, 4]], "3": [[1, 1]]}
+
+def test_show_key_prefers_simkl_id():
+    assert show_key({"title": "Dark", "year": 2017, "ids": {"simkl": 42}}) == "42"
+    assert show_key({"title": "Dark", "year": 2017, "ids": {}}) == "Dark_2017"
@@ -0,0 +1,34 @@
+from journal import ImportJournal, call_hash
+from schemas import PlannedCall
+
+def call(payload, endpoint="https://api.simkl.com/sync/ratings"):
+    return PlannedCall(kind="ratings", description="Sending ratings", endpoint=endpoint, payload=payload, items=1)
+
+def test_hash_ignores_key_order_but_not_content():
+    assert call_hash(call({"movies": [{"a": 1, "b": 2}]})) == call_hash(call({"movies": [{"b": 2, "a": 1}]}))
+    assert call_hash(call({"movies": [{"a": 1}]})) != call_hash(call({"movies": [{"a": 2}]}))
+    assert call_hash(call({"movies": []})) != call_hash(call({"movies": []}, endpoint="https://api.simkl.com/sync/history"))
+
+def test_completed_calls_survive_a_restart(tmp_path):
+    path = str(tmp_path / "journal.json")
+    sent, pending = call({"movies": [{"ids": {"simkl": 1}}]}), call({"movies": [{"ids": {"simkl": 2}}]})
+    ImportJournal(path).mark_completed(sent)
+
+    resumed = ImportJournal(path)
+    assert resumed.is_completed(sent)
+    assert not resumed.is_completed(pending)
+
+def test_clear_forgets_everything(tmp_path):
+    path = tmp_path / "journal.json"
+    journal = ImportJournal(str(path))
+    sent = call({"movies": [{"ids": {"simkl": 1}}]})
+    journal.mark_completed(sent)
+    journal.clear()
+
+    assert not path.exists()
+    assert not ImportJournal(str(path)).is_completed(sent)
+
+def test_corrupt_journal_starts_from_scratch(tmp_path):
+    path = tmp_path / "journal.json"
+    path.write_text("{not json", encoding="utf-8")
+    assert ImportJournal(str(path)).completed == {}
@@ -0,0 +1,62 @@
+import planner
+from config import SIMKL_IMPORT_ENDPOINT, SIMKL_ADD_TO_LIST_ENDPOINT, SIMKL_HISTORY_ENDPOINT
+
+def entry(simkl_id, to="completed"):
+    return {"title": f"Title {simkl_id}", "year": 2000, "to": to, "ids": {"simkl": simkl_id}}
+
+RATING_GROUPS = {
+    8: {"movies": [entry(1)], "shows": [entry(2)]},
+    10: {"movies": [entry(3)], "shows": []},
+}
+PLANTOWATCH = {"movies": [entry(4, "plantowatch")], "shows": []}
+WATCHING = {"movies": [], "shows": [entry(2, "watching")]}
+WATCHED_SHOWS = [{"title": "Title 2", "ids": {"simkl": 2}, "seasons": [{"number": 1, "episodes": [{"number": 1}]}]}]
+
+def test_plan_import_uses_one_call_per_endpoint(monkeypatch):
+    monkeypatch.setattr(planner, "SIMKL_PER_ITEM_RATINGS", True)
+    plan = planner.plan_import(RATING_GROUPS, PLANTOWATCH, WATCHING, WATCHED_SHOWS)
+
+    assert [call["endpoint"] for call in plan] == [SIMKL_IMPORT_ENDPOINT, SIMKL_ADD_TO_LIST_ENDPOINT, SIMKL_HISTORY_ENDPOINT]
+    ratings, additions, history = plan
+    # Highest rating first, every item carrying its own rating
+    assert [(item["ids"]["simkl"], item["rating"]) for item in ratings["payload"]["movies"]] == [(3, 10), (1, 8)]
+    assert ratings["items"] == 3
+    # A show that is both rated and being watched is only added to a list once
+    assert [item["ids"]["simkl"] for item in additions["payload"]["shows"]] == [2]
+    assert additions["items"] == 4
+    assert history["payload"] == {"shows": WATCHED_SHOWS}
+
+def test_plan_import_per_rating_value(monkeypatch):
+    monkeypatch.setattr(planner, "SIMKL_PER_ITEM_RATINGS", False)
+    plan = planner.plan_import(RATING_GROUPS, PLANTOWATCH, WATCHING, [])
+    assert [call["endpoint"] for call in plan if call["kind"] == "ratings"] == [
+        f"{SIMKL_IMPORT_ENDPOINT}?rating=10", f"{SIMKL_IMPORT_ENDPOINT}?rating=8"
+    ]
+    assert not [call for call in plan if call["kind"] == "history"]
+
+def test_plan_import_skips_empty_buckets():
+    assert planner.plan_import({}, {"movies": [], "shows": []}, {"movies": [], "shows": []}, []) == []
+
+def test_split_call_keeps_order_and_limits_size(monkeypatch):
+    monkeypatch.setattr(planner, "SIMKL_PER_ITEM_RATINGS", True)
+    call = planner.plan_list_additions({"movies": [entry(i) for i in range(5)], "shows": [entry(10), entry(11)]})[0]
+    parts = planner.split_call(call, 3)
+
+    assert [part["items"] for part in parts] == [3, 3, 1]
+    flattened = [item["ids"]["simkl"] for part in parts for section in ("movies", "shows") for item in part["payload"][section]]
+    assert flattened == [0, 1, 2, 3, 4, 10, 11]
+    assert parts[1]["payload"] == {"movies": [entry(3), entry(4)], "shows": [entry(10)]}
+    assert parts[0]["description"].endswith("(part 1/3)")
+    assert all(part["endpoint"] == call["endpoint"] for part in parts)
+
+def test_split_call_leaves_small_calls_alone():
+    call = planner.plan_history(WATCHED_SHOWS)[0]
+    assert planner.split_call(call, 5) == [call]
+    assert planner.split_call(call, 0) == [call]
+
+def test_chunk_plan_splits_every_call(monkeypatch):
+    monkeypatch.setattr(planner, "SIMKL_PER_ITEM_RATINGS", True)
+    plan = planner.plan_import(RATING_GROUPS, PLANTOWATCH, WATCHING, WATCHED_SHOWS)
+    chunked = planner.chunk_plan(plan, 2)
+    assert [call["items"] for call in chunked] == [2, 1, 2, 2, 1]
+    assert sum(call["items"] for call in chunked) == sum(call["items"] for call in plan)
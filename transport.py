@@ -0,0 +1,160 @@
+"""Shared HTTP transport for the taste.io and Simkl APIs.
+
+Every request goes through a pooled keep-alive session for its host, with connect/read timeouts,
+the host's adaptive pacer, retries with jittered exponential backoff (honouring Retry-After) and
+a per-host circuit breaker. Simkl's 412 daily quota answer is raised as SimklApiLimitException.
+Responses can be recorded to and replayed from the cassette store (see cassette.py).
+"""
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import cassette
+from cache import SimklApiLimitException
+from config import (
+    HTTP_CASSETTE_MODE, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP_POOL_SIZE, HTTP_MAX_RETRIES,
+    HTTP_BACKOFF_BASE, HTTP_BACKOFF_MAX, CIRCUIT_BREAKER_THRESHOLD, CIRCUIT_BREAKER_COOLDOWN
+)
+from pacing import get_pacer, parse_retry_after
+
+# Responses worth retrying, everything else is returned to the caller as is
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+SIMKL_API_HOST = "api.simkl.com"
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised instead of sending a request while a host's circuit breaker is open."""
+
+class CircuitBreaker:
+    """Stops sending requests to a host after repeated failures, then lets a single trial request through
+    once the cooldown has passed."""
+
+    def __init__(self, host: str):
+        self.host = host
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    def before_request(self) -> None:
+        with self.lock:
+            if self.opened_at is None:
+                return
+            remaining = self.opened_at + CIRCUIT_BREAKER_COOLDOWN - time.monotonic()
+            if remaining > 0:
+                raise CircuitOpenError(
+                    f"Circuit open for {self.host} after {self.failures} consecutive failures, "
+                    f"retrying in {remaining:.0f}s"
+                )
+            # Half-open: allow this request through, a failure reopens the circuit straight away
+            self.opened_at = None
+            self.failures = CIRCUIT_BREAKER_THRESHOLD - 1
+
+    def record_success(self) -> None:
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self) -> None:
+        with self.lock:
+            self.failures += 1
+            if self.failures >= CIRCUIT_BREAKER_THRESHOLD:
+                self.opened_at = time.monotonic()
+
+_sessions = {}
+_breakers = {}
+_registry_lock = threading.Lock()
+
+def get_session(host: str) -> requests.Session:
+    """Return the pooled keep-alive session for the host."""
+    with _registry_lock:
+        if host not in _sessions:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[host] = session
+        return _sessions[host]
+
+def get_breaker(host: str) -> CircuitBreaker:
+    """Return the circuit breaker for the host."""
+    with _registry_lock:
+        if host not in _breakers:
+            _breakers[host] = CircuitBreaker(host)
+        return _breakers[host]
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff for the given retry attempt (0-based)."""
+    return random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * (2 ** attempt)))
+
+def http_request(method: str, url: str, max_retries: int = HTTP_MAX_RETRIES, **kwargs) -> requests.Response:
+    """Send a request through the shared transport and return the final response.
+
+    Connection errors, timeouts and retryable statuses are retried up to max_retries times; the last
+    response is returned so callers keep using raise_for_status(). Raises SimklApiLimitException when
+    Simkl reports the daily quota is used up and CircuitOpenError while the host is failing.
+    With HTTP_CASSETTE_MODE set, final responses are recorded to or replayed from the cassette store.
+    """
+    if HTTP_CASSETTE_MODE == "replay":
+        response = cassette.replay(method, url, **kwargs)
+    else:
+        response = _send(method, url, max_retries, **kwargs)
+        if HTTP_CASSETTE_MODE == "record":
+            cassette.record(method, url, response, **kwargs)
+
+    if urlsplit(url).netloc == SIMKL_API_HOST and response.status_code == 412:
+        raise SimklApiLimitException(
+            "Simkl API daily limit reached. Please wait until tomorrow before trying again "
+            "or check your limit at: https://simkl.com/settings/developer/"
+        )
+    return response
+
+def _send(method: str, url: str, max_retries: int, **kwargs) -> requests.Response:
+    """Send the request over the network with pacing, retries and the circuit breaker."""
+    kwargs.setdefault("timeout", (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT))
+    host = urlsplit(url).netloc
+    session = get_session(host)
+    breaker = get_breaker(host)
+    pacer = get_pacer(url)
+
+    attempt = 0
+    while True:
+        breaker.before_request()
+        pacer.wait()
+        start = time.monotonic()
+        try:
+            response = session.request(method, url, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            pacer.record(time.monotonic() - start, blocked=True)
+            breaker.record_failure()
+            if attempt >= max_retries:
+                raise
+            delay = backoff_delay(attempt)
+            print(f"Request to {host} failed ({e.__class__.__name__}), retrying in {delay:.1f}s...")
+            time.sleep(delay)
+            attempt += 1
+            continue
+
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        pacer.record(
+            time.monotonic() - start,
+            status_code=response.status_code,
+            # These are JSON APIs, an HTML answer is an anti-bot or error page
+            blocked="text/html" in response.headers.get("Content-Type", ""),
+            retry_after=retry_after
+        )
+
+        if response.status_code in RETRY_STATUS_CODES:
+            breaker.record_failure()
+            if attempt < max_retries:
+                delay = max(backoff_delay(attempt), retry_after or 0)
+                print(f"{host} answered {response.status_code}, retrying in {delay:.1f}s...")
+                time.sleep(delay)
+                attempt += 1
+                continue
+            return response
+
+        breaker.record_success()
+        return response
@@ -0,0 +1,284 @@
+"""Calibrates the importer's request size and parallelism.
+
+Sends the same sample of ratings with every combination of items per request and concurrent
+requests, measures throughput, latency and error rate, and picks the fastest error-free
+combination (favouring fewer parallel requests). Every combination is tried TRIAL_ROUNDS times in
+a shuffled order, each trial starting from the same pacing state, so no combination benefits
+from running after the others. The measurements are written to IMPORT_TUNING_REPORT.
+
+By default the calibration runs against a local stand-in that models a per-request overhead,
+a per-item cost, limited server capacity and a maximum payload size, so the tuning loop itself
+can be tried without spending Simkl requests; its result is only reported. With --live it runs
+against Simkl's ratings endpoint with ratings from the backup, which Simkl already has or accepts
+again unchanged, and the result is saved to IMPORT_TUNING_FILE, which importer.py uses from then on.
+
+Usage:
+    python tune.py [--live] [--items N]
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from cache import SimklApiLimitException
+from config import (
+    OUTPUT_FILE, SIMKL_IMPORT_ENDPOINT, SIMKL_API_HEADERS, SIMKL_CLIENT_ID, SIMKL_ACCESS_TOKEN,
+    IMPORT_CHUNK_SIZE, IMPORT_CONCURRENCY, IMPORT_AUTOTUNE, IMPORT_TUNING_FILE, IMPORT_TUNING_REPORT
+)
+from pacing import get_pacer
+from transport import http_request
+
+# Combinations tried during calibration
+CANDIDATE_CHUNK_SIZES = (25, 50, 100, 250, 500)
+CANDIDATE_CONCURRENCY = (1, 2, 4)
+# Throughput within this fraction of the best counts as equally fast
+TOLERANCE = 0.05
+# Number of times every combination is tried, in a new random order each round
+TRIAL_ROUNDS = 2
+
+# Behaviour of the local stand-in
+STAND_IN_BASE_LATENCY = 0.05  # Seconds of overhead per request
+STAND_IN_ITEM_LATENCY = 0.001  # Seconds per item in the payload
+STAND_IN_CAPACITY = 2  # Requests the stand-in processes at the same time, the rest queue up
+STAND_IN_MAX_ITEMS = 250  # Larger payloads are rejected with 413
+
+def load_tuning() -> tuple:
+    """Return the (chunk size, concurrency) the importer should use: the calibrated settings if
+    IMPORT_AUTOTUNE is on and a calibration against Simkl was saved, otherwise IMPORT_CHUNK_SIZE and
+    IMPORT_CONCURRENCY."""
+    if IMPORT_AUTOTUNE and os.path.exists(IMPORT_TUNING_FILE):
+        try:
+            with open(IMPORT_TUNING_FILE, 'r', encoding='utf-8') as f:
+                tuning = json.load(f)
+            # A calibration against anything but Simkl (e.g. the stand-in) says nothing about real imports
+            if tuning.get('target') == SIMKL_IMPORT_ENDPOINT:
+                return int(tuning['chunk_size']), max(int(tuning['concurrency']), 1)
+        except Exception as e:
+            print(f"Error loading import tuning, using the configured settings: {e}")
+    return IMPORT_CHUNK_SIZE, max(IMPORT_CONCURRENCY, 1)
+
+class StandInHandler(BaseHTTPRequestHandler):
+    capacity = threading.Semaphore(STAND_IN_CAPACITY)
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        items = sum(len(entries) for entries in payload.values() if isinstance(entries, list))
+        if items > STAND_IN_MAX_ITEMS:
+            status = 413
+        else:
+            with self.capacity:
+                time.sleep(STAND_IN_BASE_LATENCY + STAND_IN_ITEM_LATENCY * items)
+            status = 201
+        body = json.dumps({"added": items if status == 201 else 0}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_stand_in() -> ThreadingHTTPServer:
+    """Start the stand-in on a free local port in a background thread."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def load_sample(count: int) -> list:
+    """Take up to count rated entries with a Simkl ID from the backup, with their ratings rounded as the importer does."""
+    entries = []
+    if os.path.exists(OUTPUT_FILE):
+        with open(OUTPUT_FILE, 'r', encoding='utf-8') as f:
+            backup = json.load(f)
+        for section in ('movies', 'shows'):
+            entries.extend(
+                (section, {**entry, 'rating': round(entry['rating'])})
+                for entry in backup.get(section, [])
+                if entry.get('rating') is not None and (entry.get('ids') or {}).get('simkl')
+            )
+    return entries[:count]
+
+def synthetic_sample(count: int) -> list:
+    """Made-up ratings for the stand-in."""
+    return [('movies', {'title': f"Movie {i}", 'year': 2000, 'rating': 8, 'ids': {'simkl': i + 1}}) for i in range(count)]
+
+def run_trial(endpoint: str, headers: dict, sample: list, chunk_size: int, concurrency: int) -> dict:
+    """Send the sample in chunks of chunk_size with up to concurrency requests in flight and measure the result."""
+    # Every trial starts from the same pacing state instead of inheriting what the previous one left
+    get_pacer(endpoint).reset()
+    chunks = []
+    for i in range(0, len(sample), chunk_size):
+        payload = {'movies': [], 'shows': []}
+        for section, entry in sample[i:i + chunk_size]:
+            payload[section].append(entry)
+        chunks.append(payload)
+
+    # Set once Simkl reports its daily limit, so the queued chunks aren't sent anymore
+    limit_reached = threading.Event()
+
+    def send(payload: dict) -> tuple:
+        start = time.monotonic()
+        if limit_reached.is_set():
+            return 0.0, False
+        try:
+            # No retries, failures are part of what is being measured
+            response = http_request("POST", endpoint, max_retries=0, headers=headers, json=payload)
+            ok = response.status_code < 400
+        except requests.exceptions.RequestException:
+            ok = False
+        except SimklApiLimitException:
+            limit_reached.set()
+            ok = False
+        return time.monotonic() - start, ok
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(send, chunks))
+    elapsed = time.monotonic() - start
+    if limit_reached.is_set():
+        raise SimklApiLimitException("Simkl API daily limit reached during calibration")
+
+    return {
+        "elapsed": elapsed,
+        "latencies": [latency for latency, _ in results],
+        "errors": sum(1 for _, ok in results if not ok),
+        "accepted_items": sum(
+            sum(len(entries) for entries in payload.values())
+            for payload, (_, ok) in zip(chunks, results) if ok
+        ),
+    }
+
+def summarize(chunk_size: int, concurrency: int, trials: list) -> dict:
+    """Combine the trials of one combination into its throughput, latency percentiles and error rate."""
+    latencies = sorted(latency for trial in trials for latency in trial["latencies"])
+    elapsed = sum(trial["elapsed"] for trial in trials)
+    return {
+        "chunk_size": chunk_size,
+        "concurrency": concurrency,
+        "requests": len(latencies) // len(trials),
+        "items_per_second": sum(trial["accepted_items"] for trial in trials) / elapsed if elapsed else 0.0,
+        "p50_latency": latencies[len(latencies) // 2],
+        "p95_latency": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        "error_rate": sum(trial["errors"] for trial in trials) / len(latencies),
+    }
+
+def run_trials(endpoint: str, headers: dict, sample: list, chunk_sizes: list) -> tuple:
+    """Try every combination TRIAL_ROUNDS times in a shuffled order and summarize each one.
+    Returns the summaries and whether every trial ran; when Simkl's daily limit stops the
+    calibration, only the combinations with at least one finished trial are summarized."""
+    combinations = [(chunk_size, concurrency) for chunk_size in chunk_sizes for concurrency in CANDIDATE_CONCURRENCY]
+    trials = {combination: [] for combination in combinations}
+    complete = True
+    try:
+        for round_number in range(1, TRIAL_ROUNDS + 1):
+            order = random.sample(combinations, len(combinations))
+            for chunk_size, concurrency in order:
+                print(f"Round {round_number}/{TRIAL_ROUNDS}: {chunk_size} items per request with {concurrency} in parallel...")
+                trials[(chunk_size, concurrency)].append(run_trial(endpoint, headers, sample, chunk_size, concurrency))
+    except SimklApiLimitException as api_limit_exc:
+        print(f"{api_limit_exc}, stopping the calibration")
+        complete = False
+    results = [
+        summarize(chunk_size, concurrency, trials[(chunk_size, concurrency)])
+        for chunk_size, concurrency in combinations if trials[(chunk_size, concurrency)]
+    ]
+    return results, complete
+
+def choose(results: list) -> dict:
+    """Pick the error-free combination with the fewest parallel requests whose throughput is within
+    TOLERANCE of the best, so a marginal gain doesn't cost extra load on Simkl."""
+    candidates = [result for result in results if result["error_rate"] == 0] or results
+    best = max(result["items_per_second"] for result in candidates)
+    close = [result for result in candidates if result["items_per_second"] >= best * (1 - TOLERANCE)]
+    return min(close, key=lambda result: (result["concurrency"], -result["items_per_second"]))
+
+def write_report(results: list, chosen: dict | None, target: str, sample_size: int, complete: bool = True) -> None:
+    lines = [
+        f"Import calibration against {target} with {sample_size} items, {TRIAL_ROUNDS} rounds "
+        f"({time.strftime('%Y-%m-%d %H:%M:%S')})",
+    ]
+    if not complete:
+        lines.append("INCOMPLETE: stopped by Simkl's daily limit, nothing was saved")
+    lines += [
+        "",
+        f"{'chunk':>6} {'parallel':>8} {'requests':>8} {'items/s':>9} {'p50 s':>7} {'p95 s':>7} {'errors':>7}",
+    ]
+    for result in results:
+        marker = "  <- chosen" if result is chosen else ""
+        lines.append(
+            f"{result['chunk_size']:>6} {result['concurrency']:>8} {result['requests']:>8} "
+            f"{result['items_per_second']:>9.1f} {result['p50_latency']:>7.2f} {result['p95_latency']:>7.2f} "
+            f"{result['error_rate']:>6.0%}{marker}"
+        )
+    report = "\n".join(lines) + "\n"
+    with open(IMPORT_TUNING_REPORT, 'w', encoding='utf-8') as f:
+        f.write(report)
+    print(report)
+
+def main(argv: list | None = None):
+    parser = argparse.ArgumentParser(description="Calibrate the importer's request size and parallelism")
+    parser.add_argument("--live", action="store_true",
+                        help="Calibrate against Simkl's ratings endpoint with ratings from the backup")
+    parser.add_argument("--items", type=int, default=500, help="Number of items sent per combination")
+    args = parser.parse_args(argv)
+
+    if args.live:
+        if not SIMKL_CLIENT_ID or not SIMKL_ACCESS_TOKEN:
+            print("Error: SIMKL_CLIENT_ID or SIMKL_ACCESS_TOKEN not set. Please configure them in config.py")
+            return
+        sample = load_sample(args.items)
+        if not sample:
+            print(f"No rated entries with a Simkl ID found in {OUTPUT_FILE}, run scraper.py first")
+            return
+    else:
+        sample = synthetic_sample(args.items)
+
+    # A chunk as large as the sample sends it in one request and says nothing about that size
+    chunk_sizes = [chunk_size for chunk_size in CANDIDATE_CHUNK_SIZES if chunk_size < len(sample)]
+    skipped = [chunk_size for chunk_size in CANDIDATE_CHUNK_SIZES if chunk_size >= len(sample)]
+    if not chunk_sizes:
+        print(f"Error: {len(sample)} items are too few, use more than {CANDIDATE_CHUNK_SIZES[0]} to calibrate")
+        return
+    if skipped:
+        print(f"Skipping {', '.join(map(str, skipped))} items per request, use more than {skipped[0]} items to try them")
+
+    server = None
+    if args.live:
+        endpoint, headers, target = SIMKL_IMPORT_ENDPOINT, SIMKL_API_HEADERS.copy(), SIMKL_IMPORT_ENDPOINT
+    else:
+        server = start_stand_in()
+        endpoint = f"http://127.0.0.1:{server.server_address[1]}/sync/ratings"
+        headers, target = {"Content-Type": "application/json"}, "the local stand-in"
+
+    try:
+        results, complete = run_trials(endpoint, headers, sample, chunk_sizes)
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    chosen = choose(results) if complete else None
+    write_report(results, chosen, target, len(sample), complete)
+    if not complete:
+        print(f"Calibration incomplete, {IMPORT_TUNING_FILE} was not changed. Run it again once the limit has reset.")
+        return
+    if not args.live:
+        print(f"Calibrated against the stand-in only, {IMPORT_TUNING_FILE} was not changed (use --live to tune real imports)")
+        return
+    with open(IMPORT_TUNING_FILE, 'w', encoding='utf-8') as f:
+        json.dump({
+            "chunk_size": chosen["chunk_size"],
+            "concurrency": chosen["concurrency"],
+            "target": target,
+            "tuned_at": time.time(),
+        }, f, indent=2)
+    print(f"Saved {chosen['chunk_size']} items per request with {chosen['concurrency']} in parallel to {IMPORT_TUNING_FILE}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+"""SQLite-backed work queue that spreads Simkl ID lookups across worker processes and client IDs.
+
+scraper.py enqueues one (title, year, category) job per distinct title and collects the results,
+while any number of worker processes on the same machine claim jobs with a lease, resolve them
+against Simkl within each client ID's daily quota and write the IDs back. Resolved jobs are kept,
+so the database doubles as a shared resolution cache across runs.
+
+The database runs in WAL mode, which relies on shared memory and does not work over a network
+filesystem, so every worker must run on the host that stores WORK_QUEUE_FILE.
+
+Usage:
+    python work_queue.py worker [--client-id ID ...] [--wait]
+    python work_queue.py status
+"""
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+from cache import SimklApiLimitException
+from config import (
+    WORK_QUEUE_FILE, WORK_QUEUE_LEASE_SECONDS, WORK_QUEUE_POLL_SECONDS,
+    SIMKL_CLIENT_IDS, SIMKL_DAILY_QUOTA
+)
+
+# Worst case number of Simkl search requests made by a single get_ids call
+MAX_REQUESTS_PER_LOOKUP = 4
+# Number of times a job may be leased before it is considered failed
+MAX_ATTEMPTS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL,
+    year TEXT NOT NULL,
+    category TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    lease_owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    updated_at REAL,
+    UNIQUE (title, year, category)
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, lease_expires);
+CREATE TABLE IF NOT EXISTS quota (
+    client_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    used INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (client_id, day)
+);
+"""
+
+def connect(path: str = WORK_QUEUE_FILE) -> sqlite3.Connection:
+    """Open the work queue database, creating the tables if needed.
+    The file must be on a local disk: WAL mode doesn't work over a network filesystem."""
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+def job_key(title: str, year, category: str) -> tuple:
+    """Build the key a job is stored under. The year is JSON encoded so None, "" and ints round-trip."""
+    return (title, json.dumps(year), category)
+
+def enqueue_jobs(conn: sqlite3.Connection, jobs: list) -> int:
+    """Add (title, year, category) jobs to the queue, requeueing previously failed ones.
+    Returns the number of jobs that were added or requeued."""
+    now = time.time()
+    before = conn.total_changes
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for title, year, category in set(job_key(*job) for job in jobs):
+            conn.execute(
+                "INSERT INTO jobs (title, year, category, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (title, year, category) DO UPDATE "
+                "SET state = 'pending', attempts = 0, error = NULL, updated_at = excluded.updated_at "
+                "WHERE state = 'failed'",
+                (title, year, category, now)
+            )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return conn.total_changes - before
+
+def claim_job(conn: sqlite3.Connection, worker_id: str) -> tuple | None:
+    """Lease the next pending (or abandoned) job to the worker.
+    Returns (job_id, title, year, category) or None when nothing is claimable."""
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Give up on jobs whose leases keep expiring (e.g. a worker crashing on them)
+        conn.execute(
+            "UPDATE jobs SET state = 'failed', error = 'Lease expired too many times', lease_owner = NULL, updated_at = ? "
+            "WHERE state = 'leased' AND lease_expires < ? AND attempts >= ?",
+            (now, now, MAX_ATTEMPTS)
+        )
+        row = conn.execute(
+            "SELECT id, title, year, category FROM jobs "
+            "WHERE state = 'pending' OR (state = 'leased' AND lease_expires < ?) "
+            "ORDER BY id LIMIT 1",
+            (now,)
+        ).fetchone()
+        if row:
+            conn.execute(
+                "UPDATE jobs SET state = 'leased', lease_owner = ?, lease_expires = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (worker_id, now + WORK_QUEUE_LEASE_SECONDS, now, row[0])
+            )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+    if not row:
+        return None
+    job_id, title, year, category = row
+    return job_id, title, json.loads(year), category
+
+def complete_job(conn: sqlite3.Connection, job_id: int, worker_id: str, ids: dict | None) -> None:
+    """Store the resolved Simkl IDs (None if the title could not be found) for a leased job."""
+    conn.execute(
+        "UPDATE jobs SET state = 'done', result = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ? "
+        "WHERE id = ? AND lease_owner = ?",
+        (json.dumps(ids), time.time(), job_id, worker_id)
+    )
+
+def fail_job(conn: sqlite3.Connection, job_id: int, worker_id: str, error: str) -> None:
+    """Record a lookup that failed (e.g. a timeout or a server error) instead of resolving it.
+    The job goes back to the queue until it used up MAX_ATTEMPTS, then it is marked failed so the
+    next enqueue_jobs call requeues it."""
+    conn.execute(
+        "UPDATE jobs SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, error = ?, "
+        "lease_owner = NULL, lease_expires = NULL, updated_at = ? WHERE id = ? AND lease_owner = ?",
+        (MAX_ATTEMPTS, error, time.time(), job_id, worker_id)
+    )
+
+def release_job(conn: sqlite3.Connection, job_id: int, worker_id: str) -> None:
+    """Hand a leased job back to the queue without counting it as an attempt."""
+    conn.execute(
+        "UPDATE jobs SET state = 'pending', lease_owner = NULL, lease_expires = NULL, "
+        "attempts = MAX(attempts - 1, 0), updated_at = ? WHERE id = ? AND lease_owner = ?",
+        (time.time(), job_id, worker_id)
+    )
+
+def job_counts(conn: sqlite3.Connection) -> dict:
+    """Return the number of jobs in each state."""
+    return dict(conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+
+def collect_results(conn: sqlite3.Connection) -> dict:
+    """Return the Simkl IDs of every resolved job, keyed by job_key."""
+    rows = conn.execute("SELECT title, year, category, result FROM jobs WHERE state = 'done'")
+    return {(title, year, category): json.loads(result) for title, year, category, result in rows}
+
+def _today() -> str:
+    """Simkl quotas are daily, so usage is tracked per UTC day."""
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+def remaining_quota(conn: sqlite3.Connection, client_id: str) -> int:
+    """Return how many requests the client ID has left today."""
+    row = conn.execute(
+        "SELECT used FROM quota WHERE client_id = ? AND day = ?", (client_id, _today())
+    ).fetchone()
+    return SIMKL_DAILY_QUOTA - (row[0] if row else 0)
+
+def reserve_quota(conn: sqlite3.Connection, client_id: str, amount: int) -> bool:
+    """Atomically reserve requests from the client ID's daily quota. Returns False if not enough is left."""
+    day = _today()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("INSERT OR IGNORE INTO quota (client_id, day) VALUES (?, ?)", (client_id, day))
+        used = conn.execute(
+            "SELECT used FROM quota WHERE client_id = ? AND day = ?", (client_id, day)
+        ).fetchone()[0]
+        reserved = used + amount <= SIMKL_DAILY_QUOTA
+        if reserved:
+            conn.execute(
+                "UPDATE quota SET used = used + ? WHERE client_id = ? AND day = ?", (amount, client_id, day)
+            )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return reserved
+
+def refund_quota(conn: sqlite3.Connection, client_id: str, amount: int) -> None:
+    """Give back reserved requests that were not used."""
+    conn.execute(
+        "UPDATE quota SET used = MAX(used - ?, 0) WHERE client_id = ? AND day = ?",
+        (amount, client_id, _today())
+    )
+
+def exhaust_quota(conn: sqlite3.Connection, client_id: str) -> None:
+    """Mark the client ID as out of requests for today (Simkl answered with its quota error)."""
+    conn.execute(
+        "INSERT INTO quota (client_id, day, used) VALUES (?, ?, ?) "
+        "ON CONFLICT (client_id, day) DO UPDATE SET used = excluded.used",
+        (client_id, _today(), SIMKL_DAILY_QUOTA)
+    )
+
+def run_worker(client_ids: list | None = None, wait: bool = False, worker_id: str | None = None) -> int:
+    """Claim and resolve jobs until the queue is drained (or forever with wait=True).
+    Returns the number of jobs resolved by this worker."""
+    # Imported here so that scraper.py can import this module
+    import scraper
+
+    client_ids = list(client_ids or SIMKL_CLIENT_IDS)
+    if not client_ids:
+        print("Error: no Simkl client ID configured. Set SIMKL_CLIENT_ID or SIMKL_CLIENT_IDS.")
+        return 0
+
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    conn = connect()
+    resolved = 0
+    try:
+        while True:
+            # Reserve the worst case up front so concurrent workers never overshoot a quota
+            client_id = next(
+                (cid for cid in client_ids if reserve_quota(conn, cid, MAX_REQUESTS_PER_LOOKUP)), None
+            )
+            if client_id is None:
+                print(f"[{worker_id}] All Simkl client IDs have used up their daily quota, stopping.")
+                break
+
+            job = claim_job(conn, worker_id)
+            if job is None:
+                refund_quota(conn, client_id, MAX_REQUESTS_PER_LOOKUP)
+                if not wait:
+                    break
+                time.sleep(WORK_QUEUE_POLL_SECONDS)
+                continue
+
+            job_id, title, year, category = job
+            requests_before = scraper.simkl_request_count
+            try:
+                ids = scraper.get_ids(title, year, category, client_id=client_id, raise_errors=True)
+            except SimklApiLimitException:
+                release_job(conn, job_id, worker_id)
+                exhaust_quota(conn, client_id)
+                continue
+            except Exception as e:
+                # Only a "no match" answer is final, failed requests are tried again
+                refund_quota(conn, client_id, MAX_REQUESTS_PER_LOOKUP - (scraper.simkl_request_count - requests_before))
+                fail_job(conn, job_id, worker_id, str(e))
+                continue
+            refund_quota(conn, client_id, MAX_REQUESTS_PER_LOOKUP - (scraper.simkl_request_count - requests_before))
+
+            complete_job(conn, job_id, worker_id, ids)
+            resolved += 1
+    finally:
+        conn.close()
+
+    print(f"[{worker_id}] Resolved {resolved} jobs")
+    return resolved
+
+def start_local_workers(count: int) -> list:
+    """Start worker processes on this machine. They exit once the queue is drained."""
+    return [
+        subprocess.Popen([sys.executable, os.path.abspath(__file__), "worker"])
+        for _ in range(count)
+    ]
+
+def wait_for_jobs(conn: sqlite3.Connection, workers: list = ()) -> bool:
+    """Wait until every job is resolved. Returns False if the local workers stopped first
+    (e.g. because every client ID ran out of quota) while jobs were still open."""
+    last_open = None
+    while True:
+        counts = job_counts(conn)
+        open_jobs = counts.get('pending', 0) + counts.get('leased', 0)
+        if open_jobs != last_open:
+            print(f"Work queue: {counts.get('done', 0)} done, {open_jobs} open, {counts.get('failed', 0)} failed")
+            last_open = open_jobs
+        if open_jobs == 0:
+            return True
+        if workers and all(worker.poll() is not None for worker in workers):
+            return False
+        time.sleep(WORK_QUEUE_POLL_SECONDS)
+
+def main():
+    parser = argparse.ArgumentParser(description="Distributed Simkl ID resolution work queue")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    worker_parser = subparsers.add_parser("worker", help="Resolve queued jobs")
+    worker_parser.add_argument("--client-id", action="append", dest="client_ids",
+                               help="Simkl client ID to use (repeatable, defaults to SIMKL_CLIENT_IDS)")
+    worker_parser.add_argument("--wait", action="store_true",
+                               help="Keep polling for new jobs instead of exiting when the queue is empty")
+
+    subparsers.add_parser("status", help="Show job counts and today's quota usage")
+
+    args = parser.parse_args()
+    if args.command == "worker":
+        run_worker(args.client_ids, args.wait)
+    else:
+        conn = connect()
+        try:
+            print(f"Jobs: {job_counts(conn)}")
+            for client_id in SIMKL_CLIENT_IDS:
+                print(f"Client ID ...{client_id[-6:]}: {remaining_quota(conn, client_id)} requests left today")
+        finally:
+            conn.close()
+
+if __name__ == "__main__":
+    main()